@@ -2,13 +2,36 @@ import os
 import sys
 import time
 import asyncio
+import traceback
 from typing import Dict, List, Optional
 import colorama
 from colorama import Fore, Back, Style
 from modules.test_config import TestConfig
 
-# 初始化colorama
-colorama.init()
+# 初始化colorama：仅在Windows终端下一次性开启VT模式，不再包装stdout/stderr
+if os.name == 'nt' and sys.stdout.isatty():
+    colorama.just_fix_windows_console()
+
+# 测试类型 -> 显示名称
+_TYPE_DISPLAY_NAMES = {
+    "sql_injection": "SQL注入",
+    "xss": "跨站脚本",
+    "csrf": "跨站请求伪造",
+    "file_upload": "文件上传",
+    "command_injection": "命令注入"
+}
+
+# 测试类型 -> 菜单编号
+_FORWARD_TYPE_MAP = {
+    "sql_injection": "1",
+    "xss": "2",
+    "csrf": "3",
+    "file_upload": "4",
+    "command_injection": "5"
+}
+
+# 菜单编号 -> 测试类型
+_REVERSE_TYPE_MAP = {number: test_type for test_type, number in _FORWARD_TYPE_MAP.items()}
 
 class DeePulse:
     """
@@ -89,32 +112,28 @@ class DeePulse:
                 
     def _display_config_summary(self):
         """显示当前配置摘要"""
-        print(Fore.YELLOW + "\n--- 当前配置摘要 ---" + Style.RESET_ALL)
-        print(f"目标URL: {self.config.target_url or '未设置'}")
+        # 先拼接所有行，再一次性写入stdout，减少多次print的开销
+        lines = [Fore.YELLOW + "\n--- 当前配置摘要 ---" + Style.RESET_ALL]
+        lines.append(f"目标URL: {self.config.target_url or '未设置'}")
         
         if self.config.test_types:
-            test_types_map = {
-                "sql_injection": "SQL注入", 
-                "xss": "跨站脚本", 
-                "csrf": "跨站请求伪造",
-                "file_upload": "文件上传", 
-                "command_injection": "命令注入"
-            }
-            test_types = [test_types_map.get(t, t) for t in self.config.test_types]
-            print(f"测试类型: {', '.join(test_types)}")
+            test_types = [_TYPE_DISPLAY_NAMES.get(t, t) for t in self.config.test_types]
+            lines.append(f"测试类型: {', '.join(test_types)}")
         else:
-            print("测试类型: 全部")
+            lines.append("测试类型: 全部")
             
-        print(f"爬取深度: {self.config.depth}")
+        lines.append(f"爬取深度: {self.config.depth}")
         
         if self.config.auth_config:
-            print(f"认证: {self.config.auth_config.get('username', '')}:{self.config.auth_config.get('password', '').replace('*', '*')}")
+            lines.append(f"认证: {self.config.auth_config.get('username', '')}:{self.config.auth_config.get('password', '').replace('*', '*')}")
         else:
-            print("认证: 未配置")
+            lines.append("认证: 未配置")
         
         # 显示用户提示词设置
         prompt_status = "启用" if self.user_prompt_enabled else "禁用"
-        print(f"用户提示词功能: {prompt_status}, 频率: 每{self.user_prompt_frequency}轮迭代")
+        lines.append(f"用户提示词功能: {prompt_status}, 频率: 每{self.user_prompt_frequency}轮迭代")
+        
+        sys.stdout.write("\n".join(lines) + "\n")
         
     def start_test(self):
         """开始漏洞测试"""
@@ -130,14 +149,7 @@ class DeePulse:
         print(f"目标URL: {self.config.target_url}")
         
         if self.config.test_types:
-            test_types_map = {
-                "sql_injection": "SQL注入", 
-                "xss": "跨站脚本", 
-                "csrf": "跨站请求伪造",
-                "file_upload": "文件上传", 
-                "command_injection": "命令注入"
-            }
-            test_types = [test_types_map.get(t, t) for t in self.config.test_types]
+            test_types = [_TYPE_DISPLAY_NAMES.get(t, t) for t in self.config.test_types]
             print(f"测试类型: {', '.join(test_types)}")
         else:
             print("测试类型: 全部")
@@ -163,7 +175,6 @@ class DeePulse:
                 print(Fore.GREEN + "\n测试完成！" + Style.RESET_ALL)
             except Exception as e:
                 print(Fore.RED + f"\n测试过程中发生错误: {str(e)}" + Style.RESET_ALL)
-                import traceback
                 traceback.print_exc()
             finally:
                 self.test_started = False
@@ -182,24 +193,19 @@ class DeePulse:
             self.config.target_url = "http://localhost:3000/"
             
         # 测试类型
-        print(Fore.CYAN + "\n可用的测试类型:" + Style.RESET_ALL)
-        print("1. SQL注入 (sql)")
-        print("2. 跨站脚本 (xss)")
-        print("3. 跨站请求伪造 (csrf)")
-        print("4. 文件上传漏洞 (file)")
-        print("5. 命令注入 (cmd)")
-        print("6. 全部测试 (all)")
+        sys.stdout.write("\n".join([
+            Fore.CYAN + "\n可用的测试类型:" + Style.RESET_ALL,
+            "1. SQL注入 (sql)",
+            "2. 跨站脚本 (xss)",
+            "3. 跨站请求伪造 (csrf)",
+            "4. 文件上传漏洞 (file)",
+            "5. 命令注入 (cmd)",
+            "6. 全部测试 (all)"
+        ]) + "\n")
         
         # 当前选择的测试类型
         current_types = self.config.test_types or ["全部"]
-        type_mapping = {
-            "sql_injection": "1",
-            "xss": "2",
-            "csrf": "3",
-            "file_upload": "4",
-            "command_injection": "5"
-        }
-        current_choices = [type_mapping.get(t, "6") for t in self.config.test_types] if self.config.test_types else ["6"]
+        current_choices = [_FORWARD_TYPE_MAP.get(t, "6") for t in self.config.test_types] if self.config.test_types else ["6"]
         
         test_choice = input(Fore.CYAN + f"请输入测试类型编号，多个用逗号分隔 [{','.join(current_choices)}]: " + Style.RESET_ALL)
         
@@ -209,14 +215,7 @@ class DeePulse:
             else:
                 # 解析测试类型
                 choices = test_choice.split(',')
-                type_mapping = {
-                    '1': 'sql_injection',
-                    '2': 'xss',
-                    '3': 'csrf',
-                    '4': 'file_upload',
-                    '5': 'command_injection'
-                }
-                self.config.test_types = [type_mapping.get(c.strip(), 'sql_injection') for c in choices if c.strip() in type_mapping]
+                self.config.test_types = [_REVERSE_TYPE_MAP.get(c.strip(), 'sql_injection') for c in choices if c.strip() in _REVERSE_TYPE_MAP]
                 
         # 认证信息
         need_auth = input(Fore.CYAN + "\n目标网站需要认证吗? (y/n) [" + ("y" if self.config.auth_config else "n") + "]: " + Style.RESET_ALL).lower()
@@ -257,12 +256,14 @@ class DeePulse:
             time.sleep(1)
             return
             
+        # TestConfig.from_file在文件不存在时返回默认配置，需要先检查，避免覆盖当前配置
         if not os.path.exists(config_file):
             print(Fore.RED + f"错误: 文件 '{config_file}' 不存在!" + Style.RESET_ALL)
             time.sleep(2)
             return
             
         try:
+            # TestConfig.from_file已按(路径, 修改时间)缓存解析结果
             self.config = TestConfig.from_file(config_file)
             print(Fore.GREEN + f"\n成功加载配置文件: {config_file}" + Style.RESET_ALL)
         except Exception as e:
@@ -369,6 +370,5 @@ if __name__ == "__main__":
         sys.exit(0)
     except Exception as e:
         print(Fore.RED + f"\n发生错误: {str(e)}" + Style.RESET_ALL)
-        import traceback
         traceback.print_exc()
         sys.exit(1) 
\ No newline at end of file
@@ -37,6 +37,26 @@ SILICONFLOW_BACKUP_MODEL = 'deepseek-ai/DeepSeek-V2.5'
 # 设置合理的超时时间
 SILICONFLOW_TIMEOUT = int(os.getenv('SILICONFLOW_TIMEOUT', '60'))
 
+# 模型健康检查缓存: 模型名 -> (是否可用, 检查时间)
+_MODEL_HEALTH_CACHE = {}
+# 健康检查结果有效期（秒）
+_MODEL_HEALTH_TTL = 600
+
+def _get_cached_model_health(model):
+    """获取未过期的模型健康检查结果，没有时返回None"""
+    entry = _MODEL_HEALTH_CACHE.get(model)
+    if entry is None:
+        return None
+    healthy, checked_at = entry
+    if time.monotonic() - checked_at > _MODEL_HEALTH_TTL:
+        del _MODEL_HEALTH_CACHE[model]
+        return None
+    return healthy
+
+def _set_cached_model_health(model, healthy):
+    """记录模型健康检查结果"""
+    _MODEL_HEALTH_CACHE[model] = (healthy, time.monotonic())
+
 # 检查轨迹流动API密钥是否有效
 def check_siliconflow_api(timeout=30):
     """检查SiliconFlow API连接状态并测试模型可用性"""
@@ -46,14 +66,28 @@ def check_siliconflow_api(timeout=30):
     print("=" * 60)
     print("开始检查SiliconFlow API连接...")
     
+    # 如果模型最近已确认可用，直接跳过探测
+    if _get_cached_model_health(SILICONFLOW_MODEL):
+        print(f"✓ 模型 {SILICONFLOW_MODEL} 最近已确认可用，跳过连接测试")
+        return True
+    
     # 创建一个检查器实例
     checker = SiliconFlowChecker(api_key=SILICONFLOW_API_KEY, base_url=SILICONFLOW_API_URL)
     # 设置合理的超时
     checker.timeout = timeout
     
+    # 先用一次低超时的请求确认API可达，网络不通时无需逐个测试模型
+    reachable, reachable_msg = checker.check_models_endpoint()
+    print(reachable_msg)
+    if not reachable:
+        print("\n[错误] 无法连接到SiliconFlow API")
+        print("请检查您的网络连接和API密钥")
+        return False
+    
     # 首先检查指定的模型
     print(f"测试指定的模型: {SILICONFLOW_MODEL}")
     primary_success, primary_result = checker.test_model_connection(SILICONFLOW_MODEL)
+    _set_cached_model_health(SILICONFLOW_MODEL, primary_success)
     
     if primary_success:
         print(f"\n✓ 指定模型 {SILICONFLOW_MODEL} 连接成功!")
@@ -64,6 +98,7 @@ def check_siliconflow_api(timeout=30):
     # 如果指定模型失败，测试备选模型
     print(f"\n指定模型连接失败，测试备选模型: {SILICONFLOW_BACKUP_MODEL}")
     backup_success, backup_result = checker.test_model_connection(SILICONFLOW_BACKUP_MODEL)
+    _set_cached_model_health(SILICONFLOW_BACKUP_MODEL, backup_success)
     
     if backup_success:
         print(f"\n✓ 备选模型 {SILICONFLOW_BACKUP_MODEL} 连接成功!")
@@ -81,6 +116,7 @@ def check_siliconflow_api(timeout=30):
     best_model = checker.get_best_available_model()
     if best_model:
         print(f"\n✓ 找到可用模型: {best_model}")
+        _set_cached_model_health(best_model, True)
         # 更新全局模型变量
         SILICONFLOW_MODEL = best_model
         timeout = checker.get_model_specific_timeout(best_model)
@@ -284,8 +320,10 @@ async def run_automated_test(config=None, user_prompt_enabled=False, user_prompt
         config.target_url = "http://localhost:3000/"
         config.test_types = ["sql_injection", "xss"]
     
-    # 首先检查轨迹流动API
-    if not check_siliconflow_api():
+    # 首先检查轨迹流动API（阻塞的网络探测放到工作线程中，避免占用事件循环；
+    # 使用run_in_executor而不是asyncio.to_thread，后者需要Python 3.9）
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(None, check_siliconflow_api):
         print("由于无法连接到SiliconFlow API，测试将中止。")
         print("\n请检查您的API密钥和网络连接，确保可以访问SiliconFlow API。")
         sys.exit(1)
@@ -311,10 +349,10 @@ async def run_automated_test(config=None, user_prompt_enabled=False, user_prompt
         print("3. 直接按回车可跳过当前提示词输入")
         print("-" * 50)
     
-    # 创建任务
-    task = create_task_from_config(config)
+    # 创建任务（提示词拼接在工作线程中完成，事件循环可以继续处理其他回调）
+    task = await loop.run_in_executor(None, create_task_from_config, config)
     
-    # 创建一个SiteAnalyzer实例（将在第二阶段完全实现）
+    # 创建一个SiteAnalyzer实例（将在第二阶段完全实现，构造开销很小，直接创建）
     site_analyzer = SiteAnalyzer()
     
     # 创建LLM接口实例
@@ -344,8 +382,15 @@ async def run_automated_test(config=None, user_prompt_enabled=False, user_prompt
     # 运行Agent
     await agent.run()
 
-def parse_args():
-    """解析命令行参数"""
+# 命令行解析器（首次使用时构建，之后复用）
+_PARSER = None
+
+def _get_parser():
+    """获取命令行解析器，仅在第一次调用时构建"""
+    global _PARSER
+    if _PARSER is not None:
+        return _PARSER
+    
     # 获取当前设置的模型
     current_model = os.getenv('SILICONFLOW_MODEL', 'Pro/deepseek-ai/DeepSeek-V3')
     
@@ -365,7 +410,12 @@ def parse_args():
     parser.add_argument('--user-prompt', help='启用用户自定义提示词功能', action='store_true')
     parser.add_argument('--prompt-frequency', help='用户提示词输入频率（迭代次数）', type=int, default=3)
     
-    return parser.parse_args()
+    _PARSER = parser
+    return _PARSER
+
+def parse_args():
+    """解析命令行参数"""
+    return _get_parser().parse_args()
 
 def launch_cli_interface():
     """启动CLI界面"""
@@ -414,5 +464,4 @@ if __name__ == '__main__':
         print("\n测试被用户中断")
     except Exception as e:
         print(f"执行过程中发生错误: {str(e)}")
-        import traceback
         traceback.print_exc() 
\ No newline at end of file
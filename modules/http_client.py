@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+共享HTTP客户端模块
+复用连接池中的TCP/TLS连接，避免每次API调用都重新握手
+"""
+
+import importlib.util
+import threading
+
+import httpx
+
+# 连接池限制
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=128)
+
+# 安装了h2库时启用HTTP/2
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_http_client: httpx.Client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client() -> httpx.Client:
+    """
+    获取进程内共享的同步HTTP客户端
+
+    Returns:
+        启用keep-alive连接池的httpx.Client
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.Client(limits=HTTP_LIMITS, http2=HTTP2_AVAILABLE)
+    return _http_client
+
+def create_async_http_client() -> httpx.AsyncClient:
+    """
+    创建异步HTTP客户端
+
+    异步连接绑定在创建它的事件循环上，因此不做进程级共享，
+    由使用方（例如LLMInterface实例）各自持有并复用
+
+    Returns:
+        启用keep-alive连接池的httpx.AsyncClient
+    """
+    return httpx.AsyncClient(limits=HTTP_LIMITS, http2=HTTP2_AVAILABLE)
@@ -7,15 +7,39 @@ LLM接口模块
 """
 
 import os
+import re
 import json
+import asyncio
+import hashlib
+import random
+import threading
 import time
+import uuid
 import logging
-from typing import List, Dict, Any, Optional, Union, Tuple
+import traceback
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterator, Optional, Union
 
-from openai import OpenAI
-from openai.types.chat import ChatCompletionMessage
+from openai import OpenAI, AsyncOpenAI
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 from dotenv import load_dotenv
 
+from modules.http_client import get_http_client, create_async_http_client
+
+# 优先使用orjson进行JSON解析和序列化（C实现，速度更快），未安装时回退到标准库
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# 可选的磁盘缓存，用于跨进程复用JSON补全结果
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
 # 设置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -23,8 +47,154 @@ logging.basicConfig(
 )
 logger = logging.getLogger("LLMInterface")
 
-# 加载环境变量
-load_dotenv()
+# 加载环境变量（环境中已配置API密钥时跳过读取.env文件）
+if os.getenv('SILICONFLOW_API_KEY') is None:
+    load_dotenv()
+
+def _json_loads(content: str) -> Any:
+    """解析JSON字符串，解析失败时抛出json.JSONDecodeError"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def _json_dumps_pretty(data: Any) -> str:
+    """将数据序列化为带缩进的JSON字符串（用于日志）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+def _json_dumps_canonical(data: Any) -> bytes:
+    """将数据序列化为键有序的JSON字节串（用于生成缓存键）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+
+def _content_len(content: Any) -> int:
+    """计算消息内容的字符数（多模态内容只统计文本段）"""
+    if isinstance(content, str):
+        return len(content)
+    # 不把分段列表转成字符串，避免为base64图片等大块数据生成repr
+    if isinstance(content, list):
+        return sum(
+            len(part["text"]) for part in content
+            if isinstance(part, dict) and isinstance(part.get("text"), str)
+        )
+    return 0
+
+def _format_long(content: str, head: int = 300, tail: int = 300, limit: int = 1000, indent: str = "    ") -> str:
+    """将响应内容格式化为带缩进的日志文本，超过limit时只保留开头和结尾部分"""
+    if len(content) <= limit:
+        return indent + f"\n{indent}".join(content.splitlines())
+    
+    head_text = f"\n{indent}".join(content[:head].splitlines())
+    tail_text = f"\n{indent}".join(content[-tail:].splitlines())
+    return (
+        f"{indent}--- 开始部分 (前{head}字符) ---\n"
+        f"{indent}{head_text}\n"
+        f"{indent}...\n"
+        f"{indent}--- 省略了 {len(content) - head - tail} 字符 ---\n"
+        f"{indent}...\n"
+        f"{indent}{tail_text}\n"
+        f"{indent}--- 结束部分 ---"
+    )
+
+# 匹配消息中的HTML代码块，未闭合时group(1)为None
+_HTML_BLOCK_RE = re.compile(r"```html(?:(.*?)```)?", re.S)
+
+# 熔断器配置：统计窗口内失败次数达到阈值后打开，冷却期结束后放行一次探测请求
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_FAILURE_WINDOW = 60  # 秒
+BREAKER_COOLDOWN = 30  # 秒
+
+# 计入熔断统计的错误类型（超时、连接失败、限流、服务端5xx）
+BREAKER_ERRORS = (APITimeoutError, APIConnectionError, RateLimitError, InternalServerError)
+
+# 触发限流（429）后的退避基准时间（秒），实际等待时间带随机抖动
+RATE_LIMIT_BACKOFF = 2.0
+
+class TokenBucket:
+    """
+    令牌桶限流器
+    同时限制每分钟请求数（RPM）和每分钟token数（TPM），令牌按时间匀速补充
+    """
+    
+    def __init__(self, rpm: int, tpm: int):
+        """
+        初始化令牌桶
+        
+        Args:
+            rpm: 每分钟最大请求数
+            tpm: 每分钟最大token数
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        """按距离上次补充经过的时间补充令牌"""
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+    
+    async def acquire(self, est_tokens: int):
+        """
+        获取一次请求所需的令牌，不足时等待补充
+        
+        Args:
+            est_tokens: 本次请求预估消耗的token数
+        """
+        # 单个请求的预估值超过桶容量时按容量计，否则永远无法获取
+        est_tokens = min(est_tokens, self.tpm)
+        # 持锁等待，保证等待中的请求按到达顺序获取令牌
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= est_tokens:
+                    self._requests -= 1
+                    self._tokens -= est_tokens
+                    return
+                wait_time = max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (est_tokens - self._tokens) * 60 / self.tpm
+                )
+                await asyncio.sleep(wait_time)
+    
+    def refund(self, est_tokens: int):
+        """
+        退还未实际消耗的令牌（例如请求被服务端限流拒绝）
+        
+        Args:
+            est_tokens: 获取时预估的token数
+        """
+        self._refill()
+        self._requests = min(self.rpm, self._requests + 1)
+        self._tokens = min(self.tpm, self._tokens + min(est_tokens, self.tpm))
+
+# get_chat_response在长对话中插入的系统提醒消息
+_SYSTEM_REMINDER = {"role": "system", "content": """记住：
+1. 你需要分析每个命令执行结果，特别注意错误和异常情况
+2. 注意观察SQL注入测试中的页面变化，包括空白页面和错误页面
+3. 必须正确解读ORDER BY测试的结果来确定列数
+4. 使用UNION SELECT确定哪些列可以回显数据
+5. 一旦获得关键信息，根据这些信息调整后续查询
+6. 所有分析和解释必须使用中文
+7. 你的输出必须是命令，每行一个，不要添加任何前缀
+8. 特别注意分析HTML代码，寻找验证码和隐藏字段
+9. 仔细分析页面结构和CSS类名，以便更精确地定位元素
+10. 观察HTML中的表单结构，确保正确识别所有输入字段尤其是验证码字段
+"""}
+
+# 支持提示缓存（cache_control）的服务商使用的版本：系统提示和提醒构成的固定前缀可复用服务端KV缓存
+_SYSTEM_REMINDER_CACHED = {"role": "system", "content": [{
+    "type": "text",
+    "text": _SYSTEM_REMINDER["content"],
+    "cache_control": {"type": "ephemeral"}
+}]}
 
 class LLMInterface:
     """
@@ -39,7 +209,14 @@ class LLMInterface:
         model: str = "Pro/deepseek-ai/DeepSeek-V3",
         backup_model: str = "deepseek-ai/DeepSeek-V2.5",
         timeout: int = 60,
-        verbose_logging: bool = True
+        verbose_logging: bool = True,
+        max_concurrency: int = 8,
+        cache_size: int = 128,
+        rpm: int = 600,
+        tpm: int = 200_000,
+        disk_cache_dir: Optional[str] = None,
+        disk_cache_ttl: int = 3600,
+        provider_supports_prompt_cache: bool = False
     ):
         """
         初始化LLM接口
@@ -51,6 +228,13 @@ class LLMInterface:
             backup_model: 备选模型，当默认模型不可用时使用
             timeout: 请求超时时间（秒）
             verbose_logging: 是否启用详细日志记录
+            max_concurrency: 异步请求的最大并发数
+            cache_size: 响应缓存的最大条目数，为0时禁用缓存
+            rpm: 异步请求每分钟最大请求数
+            tpm: 异步请求每分钟最大token数
+            disk_cache_dir: JSON补全结果的磁盘缓存目录（例如 ~/.deepulse/llm_cache），为None时禁用
+            disk_cache_ttl: 磁盘缓存条目的过期时间（秒）
+            provider_supports_prompt_cache: 服务商是否支持cache_control提示缓存标记，不支持时不发送该字段
         """
         self.api_key = api_key or os.getenv('SILICONFLOW_API_KEY', 'YOUR_API_KEY')
         self.base_url = base_url
@@ -59,21 +243,66 @@ class LLMInterface:
         self.current_model = model  # 当前使用的模型
         self.timeout = timeout
         self.verbose_logging = verbose_logging
+        self.provider_supports_prompt_cache = provider_supports_prompt_cache
         
         # 统计数据
         self.call_count = 0
         self.error_count = 0
         self.total_tokens = 0
         self.total_time = 0
+        self._stats_lock = threading.Lock()  # 保护并发请求（abatch、多线程）下的计数
+        
+        # 响应缓存（LRU），仅缓存temperature为0的确定性请求
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.cache_stats = {"hits": 0, "misses": 0}
+        
+        # 磁盘缓存（需要安装diskcache），跨进程复用json_completion的结果
+        self.disk_cache = None
+        self.disk_cache_ttl = disk_cache_ttl
+        if disk_cache_dir:
+            if DISKCACHE_AVAILABLE:
+                self.disk_cache = diskcache.Cache(os.path.expanduser(disk_cache_dir), size_limit=2 << 30)
+            else:
+                logger.warning("未安装diskcache，磁盘缓存已禁用")
+        
+        # 每个模型的熔断器状态: closed（正常）/ open（熔断）/ half_open（探测中）
+        self._breakers = {}
         
         # 创建OpenAI客户端
         self.client = OpenAI(
             api_key=self.api_key,
             base_url=self.base_url,
-            timeout=self.timeout
+            timeout=self.timeout,
+            http_client=get_http_client()  # 复用共享连接池，避免重复TCP/TLS握手
         )
         
-        logger.info(f"LLM接口初始化完成，使用模型: {self.current_model}")
+        # 创建异步OpenAI客户端，用于并发请求
+        self.aclient = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            http_client=create_async_http_client()
+        )
+        
+        # 限制异步请求的并发数量
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        
+        # 按RPM/TPM限流，避免并发请求触发服务端429
+        self._rate_limiter = TokenBucket(rpm, tpm)
+        
+        logger.info("LLM接口初始化完成，使用模型: %s", self.current_model)
+    
+    def _next_request_id(self) -> str:
+        """
+        递增调用计数并生成唯一的请求ID
+        
+        Returns:
+            请求ID，并发请求之间不会重复
+        """
+        with self._stats_lock:
+            self.call_count += 1
+        return f"req-{uuid.uuid4().hex[:8]}"
     
     def _truncate_message_for_log(self, message: Dict[str, Any], max_length: int = 500) -> Dict[str, Any]:
         """
@@ -123,6 +352,232 @@ class LLMInterface:
             result.append(f"{truncated_msg['role']}: {truncated_msg['content']}")
         return "\n".join(result)
     
+    def _cache_key(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict[str, str]]
+    ) -> str:
+        """
+        根据请求参数生成缓存键
+        
+        Returns:
+            请求参数的SHA-256摘要
+        """
+        payload = _json_dumps_canonical({
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "response_format": response_format
+        })
+        return hashlib.sha256(payload).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """
+        从响应缓存中读取结果，命中时将条目移到最近使用的位置
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            缓存的响应文本，未命中时返回None
+        """
+        content = self._cache.get(key)
+        if content is None:
+            self.cache_stats["misses"] += 1
+            return None
+        self._cache.move_to_end(key)
+        self.cache_stats["hits"] += 1
+        return content
+    
+    def _cache_put(self, key: str, content: str):
+        """
+        写入响应缓存，超出容量时淘汰最久未使用的条目
+        
+        Args:
+            key: 缓存键
+            content: 响应文本
+        """
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = content
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def _get_breaker(self, model: str) -> Dict[str, Any]:
+        """获取（必要时创建）指定模型的熔断器状态"""
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = {"state": "closed", "failures": [], "opened_at": 0}
+            self._breakers[model] = breaker
+        return breaker
+    
+    def _breaker_allows(self, model: str) -> bool:
+        """
+        判断熔断器是否允许向指定模型发送请求
+        
+        Args:
+            model: 模型名称
+            
+        Returns:
+            允许发送请求时返回True
+        """
+        breaker = self._get_breaker(model)
+        if breaker["state"] == "closed":
+            return True
+        if breaker["state"] == "open" and time.monotonic() - breaker["opened_at"] >= BREAKER_COOLDOWN:
+            # 冷却期结束，放行一次探测请求
+            breaker["state"] = "half_open"
+            logger.info("模型 %s 的熔断器进入半开状态，发送探测请求", model)
+            return True
+        return False
+    
+    def _breaker_record_success(self, model: str):
+        """请求成功后关闭熔断器并清空失败记录"""
+        breaker = self._get_breaker(model)
+        if breaker["state"] != "closed":
+            logger.info("模型 %s 已恢复，熔断器关闭", model)
+        breaker["state"] = "closed"
+        breaker["failures"].clear()
+    
+    def _breaker_record_failure(self, model: str, error: BaseException):
+        """
+        记录一次失败，必要时打开熔断器
+        
+        Args:
+            model: 模型名称
+            error: 捕获的异常
+        """
+        breaker = self._get_breaker(model)
+        now = time.monotonic()
+        
+        # 半开状态下探测失败，重新打开熔断器
+        if breaker["state"] == "half_open":
+            breaker["state"] = "open"
+            breaker["opened_at"] = now
+            logger.warning("模型 %s 探测请求失败，熔断器重新打开", model)
+            return
+        
+        if not isinstance(error, BREAKER_ERRORS):
+            return
+        
+        # 只保留统计窗口内的失败记录
+        failures = [t for t in breaker["failures"] if now - t < BREAKER_FAILURE_WINDOW]
+        failures.append(now)
+        breaker["failures"] = failures
+        
+        if len(failures) >= BREAKER_FAILURE_THRESHOLD:
+            breaker["state"] = "open"
+            breaker["opened_at"] = now
+            logger.warning("模型 %s 在%s秒内失败%s次，熔断器打开，%s秒内将跳过该模型", model, BREAKER_FAILURE_WINDOW, len(failures), BREAKER_COOLDOWN)
+    
+    def _log_request(
+        self,
+        request_id: str,
+        messages: List[Dict[str, Any]],
+        max_tokens: int,
+        temperature: float
+    ):
+        """
+        记录请求详情（消息数量、大小等）
+        
+        Args:
+            request_id: 请求ID
+            messages: 聊天消息列表
+            max_tokens: 最大生成token数
+            temperature: 温度（创造性）
+        """
+        # 日志级别不输出INFO时跳过全部统计工作
+        if not self.verbose_logging or not logger.isEnabledFor(logging.INFO):
+            return
+        
+        logger.info("[%s] 向模型 [%s] 发送请求", request_id, self.current_model)
+        logger.info("[%s] 请求参数: max_tokens=%s, temperature=%s", request_id, max_tokens, temperature)
+        
+        # 每条消息的长度只计算一次
+        content_lens = [_content_len(msg.get("content")) for msg in messages]
+        
+        # 记录消息数量和总体大小
+        total_chars = sum(content_lens)
+        logger.info("[%s] 总消息数: %s, 总字符数: %s", request_id, len(messages), total_chars)
+        
+        # 记录每条消息的大小（先生成所有行，再合并为一条日志输出）
+        msg_count = len(messages)
+        lines = []
+        for i, (msg, content_len) in enumerate(zip(messages, content_lens), 1):
+            content = msg.get("content", "")
+            html_match = _HTML_BLOCK_RE.search(content) if content_len > 1000 and isinstance(content, str) else None
+            if html_match is None:
+                lines.append(f"  消息[{i}/{msg_count}] ({msg['role']}): 长度={content_len}字符")
+            elif html_match.group(1) is not None:
+                # 一次扫描同时定位HTML代码块的开始和结束标记
+                html_len = len(html_match.group(1))
+                lines.append(f"  消息[{i}/{msg_count}] ({msg['role']}): 总长度={content_len}字符, HTML={html_len}字符, 其他={content_len - html_len}字符")
+            else:
+                lines.append(f"  消息[{i}/{msg_count}] ({msg['role']}): 长度={content_len}字符 (包含未闭合的HTML代码块)")
+        logger.info("[%s] 各消息大小:\n%s", request_id, "\n".join(lines))
+    
+    def _handle_response(self, request_id: str, response: Any, start_time: float) -> Optional[str]:
+        """
+        处理成功的API响应：更新统计数据并记录响应内容
+        
+        Args:
+            request_id: 请求ID
+            response: API响应对象
+            start_time: 请求开始时间
+            
+        Returns:
+            生成的文本
+        """
+        # 更新统计数据
+        end_time = time.perf_counter()
+        elapsed_time = end_time - start_time
+        self.total_time += elapsed_time
+        
+        # 获取token使用情况
+        try:
+            prompt_tokens = response.usage.prompt_tokens
+            completion_tokens = response.usage.completion_tokens
+            self.total_tokens += (prompt_tokens + completion_tokens)
+            logger.info("[%s] Token使用: 提示=%s, 补全=%s, 总计=%s", request_id, prompt_tokens, completion_tokens, prompt_tokens + completion_tokens)
+        except:
+            logger.warning("[%s] 无法获取token使用情况", request_id)
+        
+        # 获取并记录生成的文本
+        content = response.choices[0].message.content
+        
+        if self.verbose_logging and logger.isEnabledFor(logging.INFO):
+            # 记录响应内容，保留格式，过长时只显示开头和结尾部分
+            if len(content) > 1000:
+                logger.info("[%s] API响应内容 (总长度: %s字符):\n%s", request_id, len(content), _format_long(content))
+            else:
+                logger.info("[%s] API响应内容:\n%s", request_id, _format_long(content))
+        
+        logger.info("[%s] 请求成功，耗时: %.2f秒", request_id, elapsed_time)
+        
+        return content
+    
+    def _handle_error(self, request_id: str, error: Exception, start_time: float):
+        """
+        处理失败的API请求：更新统计数据并记录错误
+        
+        Args:
+            request_id: 请求ID
+            error: 捕获的异常
+            start_time: 请求开始时间
+        """
+        # 更新统计数据
+        end_time = time.perf_counter()
+        elapsed_time = end_time - start_time
+        self.total_time += elapsed_time
+        self.error_count += 1
+        
+        logger.error("[%s] 请求失败，耗时: %.2f秒，错误: %s", request_id, elapsed_time, error)
+    
     def chat_completion(
         self, 
         messages: List[Dict[str, str]], 
@@ -144,132 +599,371 @@ class LLMInterface:
         Returns:
             生成的文本，失败时返回None
         """
-        self.call_count += 1
-        start_time = time.time()
-        request_id = f"req-{int(time.time())}-{self.call_count}"
+        # 确定性请求（temperature为0）优先查询响应缓存
+        cache_key = None
+        if temperature == 0 and self.cache_size > 0:
+            cache_key = self._cache_key(self.current_model, messages, max_tokens, temperature, response_format)
+            cached_content = self._cache_get(cache_key)
+            if cached_content is not None:
+                logger.info("命中响应缓存，跳过API调用 (模型: %s)", self.current_model)
+                return cached_content
+        
+        # 依次尝试当前模型和备选模型，同一次调用只计数和记录请求详情一次
+        models = [self.current_model]
+        if use_backup_on_failure and self.current_model != self.backup_model:
+            models.append(self.backup_model)
+        
+        request_id = None
+        for attempt, model in enumerate(models):
+            if attempt > 0:
+                logger.info("切换到备选模型: %s", model)
+                self.current_model = model
+            
+            # 熔断器打开时直接跳过该模型，不再等待请求超时
+            if not self._breaker_allows(model):
+                logger.warning("模型 %s 处于熔断状态，跳过API调用", model)
+                continue
+            
+            if request_id is None:
+                request_id = self._next_request_id()
+                # 记录请求详情
+                self._log_request(request_id, messages, max_tokens, temperature)
+            start_time = time.perf_counter()
+            
+            try:
+                logger.info("[%s] 正在调用API...", request_id)
+                
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    response_format=response_format
+                )
+                
+                self._breaker_record_success(model)
+                content = self._handle_response(request_id, response, start_time)
+                if cache_key is not None and content is not None:
+                    # 回退到备选模型时按实际使用的模型缓存
+                    if attempt > 0:
+                        cache_key = self._cache_key(model, messages, max_tokens, temperature, response_format)
+                    self._cache_put(cache_key, content)
+                return content
+                
+            except Exception as e:
+                self._handle_error(request_id, e, start_time)
+                self._breaker_record_failure(model, e)
+        
+        return None
+    
+    def chat_completion_stream(
+        self, 
+        messages: List[Dict[str, str]], 
+        max_tokens: int = 4000,
+        temperature: float = 0.7,
+        response_format: Optional[Dict[str, str]] = None
+    ) -> Iterator[str]:
+        """
+        以流式方式发送聊天补全请求，生成的文本边到达边返回
+        
+        适合需要尽早处理输出的调用方；由于部分内容可能已被消费，
+        流式请求失败时不会自动切换备选模型
+        
+        Args:
+            messages: 聊天消息列表
+            max_tokens: 最大生成token数
+            temperature: 温度（创造性）
+            response_format: 响应格式，例如 {"type": "json_object"}
+            
+        Yields:
+            生成文本的增量片段
+        """
+        if not self._breaker_allows(self.current_model):
+            logger.warning("模型 %s 处于熔断状态，跳过API调用", self.current_model)
+            return
+        
+        model = self.current_model
+        request_id = self._next_request_id()
+        start_time = time.perf_counter()
         
         # 记录请求详情
-        if self.verbose_logging:
-            logger.info(f"[{request_id}] 向模型 [{self.current_model}] 发送请求")
-            logger.info(f"[{request_id}] 请求参数: max_tokens={max_tokens}, temperature={temperature}")
-            
-            # 记录消息数量和总体大小
-            total_chars = sum(len(str(msg.get("content", ""))) for msg in messages)
-            logger.info(f"[{request_id}] 总消息数: {len(messages)}, 总字符数: {total_chars}")
-            
-            # 记录每条消息的大小
-            for i, msg in enumerate(messages):
-                content = msg.get("content", "")
-                content_len = len(str(content))
-                if content_len > 1000:
-                    # 检查是否包含HTML代码
-                    html_start = content.find("```html")
-                    if html_start > -1:
-                        html_end = content.find("```", html_start + 7)
-                        if html_end > -1:
-                            html_len = html_end - html_start - 7
-                            non_html_len = content_len - html_len
-                            logger.info(f"[{request_id}] 消息[{i+1}/{len(messages)}] ({msg['role']}): 总长度={content_len}字符, HTML={html_len}字符, 其他={non_html_len}字符")
-                        else:
-                            logger.info(f"[{request_id}] 消息[{i+1}/{len(messages)}] ({msg['role']}): 长度={content_len}字符 (包含未闭合的HTML代码块)")
-                    else:
-                        logger.info(f"[{request_id}] 消息[{i+1}/{len(messages)}] ({msg['role']}): 长度={content_len}字符")
-                else:
-                    logger.info(f"[{request_id}] 消息[{i+1}/{len(messages)}] ({msg['role']}): 长度={content_len}字符")
+        self._log_request(request_id, messages, max_tokens, temperature)
         
+        # 调用方可能中途放弃生成器（GeneratorExit）或被取消，此时也要记录结果，
+        # 否则半开状态的探测请求永远不会结束，熔断器一直停留在half_open
+        outcome_recorded = False
+        stream = None
         try:
-            logger.info(f"[{request_id}] 正在调用API...")
+            logger.info("[%s] 正在调用API（流式）...", request_id)
             
-            response = self.client.chat.completions.create(
-                model=self.current_model,
+            stream = self.client.chat.completions.create(
+                model=model,
                 messages=messages,
                 max_tokens=max_tokens,
                 temperature=temperature,
-                response_format=response_format
+                response_format=response_format,
+                stream=True,
+                # 要求服务端在最后一个数据块中返回token使用情况，否则流式请求不计入统计
+                stream_options={"include_usage": True}
             )
             
+            usage = None
+            total_len = 0
+            for chunk in stream:
+                # 服务端在最后一个数据块中返回token使用情况
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    total_len += len(delta)
+                    yield delta
+            
             # 更新统计数据
-            end_time = time.time()
-            elapsed_time = end_time - start_time
+            elapsed_time = time.perf_counter() - start_time
             self.total_time += elapsed_time
+            self._breaker_record_success(model)
+            outcome_recorded = True
+            
+            if usage is not None:
+                self.total_tokens += (usage.prompt_tokens + usage.completion_tokens)
+                logger.info("[%s] Token使用: 提示=%s, 补全=%s, 总计=%s", request_id, usage.prompt_tokens, usage.completion_tokens, usage.prompt_tokens + usage.completion_tokens)
+            else:
+                logger.warning("[%s] 无法获取token使用情况", request_id)
+            
+            logger.info("[%s] 流式请求完成，共%s字符，耗时: %.2f秒", request_id, total_len, elapsed_time)
+            
+        except Exception as e:
+            outcome_recorded = True
+            self._handle_error(request_id, e, start_time)
+            self._breaker_record_failure(model, e)
+        finally:
+            if not outcome_recorded:
+                # 流未完整读取（GeneratorExit、KeyboardInterrupt等），按失败处理
+                self._breaker_record_failure(model, GeneratorExit())
+            # 关闭响应，未读完的连接不再继续接收数据并归还连接池
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+    
+    async def achat_completion(
+        self, 
+        messages: List[Dict[str, str]], 
+        max_tokens: int = 4000,
+        temperature: float = 0.7,
+        response_format: Optional[Dict[str, str]] = None,
+        use_backup_on_failure: bool = True
+    ) -> Optional[str]:
+        """
+        发送聊天补全请求（异步版本，不阻塞事件循环）
+        
+        Args:
+            messages: 聊天消息列表
+            max_tokens: 最大生成token数
+            temperature: 温度（创造性）
+            response_format: 响应格式，例如 {"type": "json_object"}
+            use_backup_on_failure: 失败时是否使用备选模型
+            
+        Returns:
+            生成的文本，失败时返回None
+        """
+        # 确定性请求（temperature为0）优先查询响应缓存
+        cache_key = None
+        if temperature == 0 and self.cache_size > 0:
+            cache_key = self._cache_key(self.current_model, messages, max_tokens, temperature, response_format)
+            cached_content = self._cache_get(cache_key)
+            if cached_content is not None:
+                logger.info("命中响应缓存，跳过API调用 (模型: %s)", self.current_model)
+                return cached_content
+        
+        # 依次尝试当前模型和备选模型，同一次调用只计数和记录请求详情一次
+        models = [self.current_model]
+        if use_backup_on_failure and self.current_model != self.backup_model:
+            models.append(self.backup_model)
+        
+        # 粗略估算本次请求的token消耗，用于TPM限流
+        est_tokens = len(messages) * 100 + max_tokens
+        
+        request_id = None
+        for attempt, model in enumerate(models):
+            if attempt > 0:
+                logger.info("切换到备选模型: %s", model)
+                self.current_model = model
+            
+            # 熔断器打开时直接跳过该模型，不再等待请求超时
+            if not self._breaker_allows(model):
+                logger.warning("模型 %s 处于熔断状态，跳过API调用", model)
+                continue
+            
+            if request_id is None:
+                request_id = self._next_request_id()
+                # 记录请求详情
+                self._log_request(request_id, messages, max_tokens, temperature)
+            start_time = time.perf_counter()
             
-            # 获取token使用情况
             try:
-                prompt_tokens = response.usage.prompt_tokens
-                completion_tokens = response.usage.completion_tokens
-                self.total_tokens += (prompt_tokens + completion_tokens)
-                logger.info(f"[{request_id}] Token使用: 提示={prompt_tokens}, 补全={completion_tokens}, 总计={prompt_tokens + completion_tokens}")
-            except:
-                logger.warning(f"[{request_id}] 无法获取token使用情况")
-            
-            # 获取并记录生成的文本
-            content = response.choices[0].message.content
-            
-            if self.verbose_logging:
-                # 记录响应内容，保留格式
-                if len(content) > 1000:
-                    # 截断过长内容，但保持格式，并分别显示开头和结尾部分
-                    # 创建一个缩进前缀，让日志更清晰
-                    indent = "    "
-                    log_lines = []
-                    log_lines.append(f"[{request_id}] API响应内容 (总长度: {len(content)}字符):")
-                    log_lines.append(f"{indent}--- 开始部分 (前300字符) ---")
-                    
-                    # 处理开头部分，保留格式
-                    start_content = content[:300]
-                    # 将开头部分的每一行添加缩进
-                    for line in start_content.split('\n'):
-                        log_lines.append(f"{indent}{line}")
-                    
-                    log_lines.append(f"{indent}...")
-                    log_lines.append(f"{indent}--- 省略了 {len(content) - 600} 字符 ---")
-                    log_lines.append(f"{indent}...")
-                    
-                    # 处理结尾部分，保留格式
-                    end_content = content[-300:]
-                    # 将结尾部分的每一行添加缩进
-                    for line in end_content.split('\n'):
-                        log_lines.append(f"{indent}{line}")
+                # 限制同时进行中的请求数量，并按RPM/TPM获取令牌
+                async with self._semaphore:
+                    await self._rate_limiter.acquire(est_tokens)
+                    logger.info("[%s] 正在调用API...", request_id)
                     
-                    log_lines.append(f"{indent}--- 结束部分 ---")
-                    
-                    # 合并所有行并记录
-                    logger.info('\n'.join(log_lines))
-                else:
-                    # 对于较短的内容，保留完整格式
-                    log_lines = [f"[{request_id}] API响应内容:"]
-                    # 添加4个空格缩进，保持格式清晰
-                    indent = "    "
-                    for line in content.split('\n'):
-                        log_lines.append(f"{indent}{line}")
-                    logger.info('\n'.join(log_lines))
-            
-            logger.info(f"[{request_id}] 请求成功，耗时: {elapsed_time:.2f}秒")
+                    response = await self.aclient.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        response_format=response_format
+                    )
+                
+                self._breaker_record_success(model)
+                content = self._handle_response(request_id, response, start_time)
+                if cache_key is not None and content is not None:
+                    # 回退到备选模型时按实际使用的模型缓存
+                    if attempt > 0:
+                        cache_key = self._cache_key(model, messages, max_tokens, temperature, response_format)
+                    self._cache_put(cache_key, content)
+                return content
+                
+            except Exception as e:
+                self._handle_error(request_id, e, start_time)
+                self._breaker_record_failure(model, e)
+                
+                # 被服务端限流时请求未实际消耗配额，退还令牌并带抖动退避，避免并发请求同时重试
+                if isinstance(e, RateLimitError):
+                    self._rate_limiter.refund(est_tokens)
+                    backoff = RATE_LIMIT_BACKOFF * random.uniform(0.5, 1.5)
+                    logger.warning("[%s] 触发限流，%.2f秒后继续", request_id, backoff)
+                    await asyncio.sleep(backoff)
+        
+        return None
+    
+    async def abatch(
+        self,
+        list_of_messages: List[List[Dict[str, str]]],
+        **kwargs
+    ) -> List[Union[Optional[str], BaseException]]:
+        """
+        并发发送多个聊天补全请求
+        
+        Args:
+            list_of_messages: 多组聊天消息列表
+            **kwargs: 传递给achat_completion的其他参数
             
-            return content
+        Returns:
+            与输入顺序一致的结果列表，单个请求抛出的异常会作为结果返回
+        """
+        return await asyncio.gather(
+            *[self.achat_completion(messages, **kwargs) for messages in list_of_messages],
+            return_exceptions=True
+        )
+    
+    def submit_batch(self, requests: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        通过Batch API提交一批离线聊天补全请求（适用于非交互式任务，成本更低）
+        
+        Args:
+            requests: 请求列表，每项包含messages，可选max_tokens、temperature、response_format、model
             
+        Returns:
+            批处理任务ID，提交失败时返回None
+        """
+        lines = []
+        for i, request in enumerate(requests):
+            body = {
+                "model": request.get("model", self.current_model),
+                "messages": request["messages"],
+                "max_tokens": request.get("max_tokens", 4000),
+                "temperature": request.get("temperature", 0.7)
+            }
+            if request.get("response_format"):
+                body["response_format"] = request["response_format"]
+            lines.append(_json_dumps_canonical({
+                "custom_id": f"r{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body
+            }))
+        
+        try:
+            batch_file = self.client.files.create(
+                file=("batch.jsonl", b"\n".join(lines)),
+                purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
         except Exception as e:
-            # 更新统计数据
-            end_time = time.time()
-            elapsed_time = end_time - start_time
-            self.total_time += elapsed_time
-            self.error_count += 1
+            logger.error("提交批处理任务失败: %s", e)
+            return None
+        
+        logger.info("已提交批处理任务 %s，共 %s 个请求", batch.id, len(requests))
+        return batch.id
+    
+    def poll_batch(
+        self,
+        batch_id: str,
+        max_wait: float = 86400,
+        initial_interval: float = 5,
+        max_interval: float = 300
+    ) -> Optional[List[Optional[str]]]:
+        """
+        轮询批处理任务直到完成，并取回结果
+        
+        Args:
+            batch_id: submit_batch返回的批处理任务ID
+            max_wait: 最长等待时间（秒）
+            initial_interval: 首次轮询间隔（秒），之后按指数退避
+            max_interval: 最大轮询间隔（秒）
             
-            logger.error(f"[{request_id}] 请求失败，耗时: {elapsed_time:.2f}秒，错误: {str(e)}")
+        Returns:
+            与提交顺序一致的结果列表（单个请求失败时为None），任务失败或超时返回None
+        """
+        deadline = time.monotonic() + max_wait
+        interval = initial_interval
+        
+        while True:
+            try:
+                batch = self.client.batches.retrieve(batch_id)
+            except Exception as e:
+                logger.error("查询批处理任务 %s 失败: %s", batch_id, e)
+                return None
             
-            # 如果启用了备选模型且当前不是备选模型，则尝试使用备选模型
-            if use_backup_on_failure and self.current_model != self.backup_model:
-                logger.info(f"[{request_id}] 尝试使用备选模型: {self.backup_model}")
-                self.current_model = self.backup_model
-                return self.chat_completion(
-                    messages=messages,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    response_format=response_format,
-                    use_backup_on_failure=False  # 防止无限递归
-                )
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                logger.error("批处理任务 %s 结束，状态: %s", batch_id, batch.status)
+                return None
+            if time.monotonic() + interval > deadline:
+                logger.error("等待批处理任务 %s 超时，当前状态: %s", batch_id, batch.status)
+                return None
             
-            return None
+            logger.info("批处理任务 %s 状态: %s，%s秒后重试", batch_id, batch.status, interval)
+            time.sleep(interval)
+            interval = min(interval * 2, max_interval)
+        
+        results = [None] * batch.request_counts.total
+        if not batch.output_file_id:
+            return results
+        
+        output = self.client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            item = _json_loads(line)
+            index = int(item["custom_id"][1:])
+            response = item.get("response") or {}
+            if response.get("status_code") != 200:
+                logger.warning("批处理请求 %s 失败: %s", item["custom_id"], item.get("error"))
+                continue
+            body = response["body"]
+            usage = body.get("usage") or {}
+            self.total_tokens += usage.get("total_tokens", 0)
+            results[index] = body["choices"][0]["message"]["content"]
+        
+        return results
     
     def json_completion(
         self, 
@@ -288,24 +982,34 @@ class LLMInterface:
         Returns:
             JSON格式的响应，失败时返回None
         """
-        # 确保系统消息包含JSON输出说明
-        has_system_message = False
-        for msg in messages:
-            if msg.get("role") == "system":
-                if "JSON" not in msg.get("content", ""):
-                    msg["content"] += " You are a helpful assistant designed to output JSON."
-                has_system_message = True
-                break
+        # 确保系统消息包含JSON输出说明（构造新列表，不修改调用方传入的消息）
+        sys_idx = next((i for i, msg in enumerate(messages) if msg.get("role") == "system"), -1)
         
-        if not has_system_message:
-            messages.insert(0, {
+        if sys_idx == -1:
+            messages = [{
                 "role": "system",
                 "content": "You are a helpful assistant designed to output JSON."
-            })
+            }, *messages]
+        elif "JSON" not in messages[sys_idx].get("content", ""):
+            system_message = {
+                **messages[sys_idx],
+                "content": messages[sys_idx]["content"] + " You are a helpful assistant designed to output JSON."
+            }
+            messages = messages[:sys_idx] + [system_message] + messages[sys_idx + 1:]
         
         # 设置JSON响应格式
         response_format = {"type": "json_object"}
         
+        # 优先查询磁盘缓存
+        disk_key = None
+        requested_model = self.current_model
+        if self.disk_cache is not None:
+            disk_key = self._cache_key(requested_model, messages, max_tokens, temperature, response_format)
+            cached_result = self.disk_cache.get(disk_key)
+            if cached_result is not None:
+                logger.info("命中磁盘缓存，跳过API调用 (模型: %s)", requested_model)
+                return cached_result
+        
         # 发送请求
         content = self.chat_completion(
             messages=messages,
@@ -316,17 +1020,23 @@ class LLMInterface:
         
         if content:
             try:
-                json_result = json.loads(content)
+                json_result = _json_loads(content)
                 
-                if self.verbose_logging:
-                    # 记录解析后的JSON
-                    json_str = json.dumps(json_result, ensure_ascii=False, indent=2)
-                    logger.info(f"解析后的JSON响应:\n{json_str}")
+                if self.verbose_logging and logger.isEnabledFor(logging.INFO):
+                    # 记录解析后的JSON（带缩进的序列化开销较大，仅在会输出时执行）
+                    json_str = _json_dumps_pretty(json_result)
+                    logger.info("解析后的JSON响应:\n%s", json_str)
+                
+                if disk_key is not None:
+                    # 回退到备选模型时chat_completion已切换current_model，按实际回答的模型缓存
+                    if self.current_model != requested_model:
+                        disk_key = self._cache_key(self.current_model, messages, max_tokens, temperature, response_format)
+                    self.disk_cache.set(disk_key, json_result, expire=self.disk_cache_ttl)
                 
                 return json_result
             except json.JSONDecodeError as e:
-                logger.error(f"JSON解析失败: {str(e)}")
-                logger.debug(f"原始内容: {content}")
+                logger.error("JSON解析失败: %s", e)
+                logger.debug("原始内容: %s", content)
                 return None
         
         return None
@@ -348,13 +1058,15 @@ class LLMInterface:
             "total_tokens": self.total_tokens,
             "total_time": f"{self.total_time:.2f}秒",
             "avg_time": f"{avg_time:.2f}秒/请求",
-            "current_model": self.current_model
+            "current_model": self.current_model,
+            "cache_hits": self.cache_stats["hits"],
+            "cache_misses": self.cache_stats["misses"]
         }
     
     def reset_model(self):
         """重置为默认模型"""
         self.current_model = self.primary_model
-        logger.info(f"已重置为默认模型: {self.current_model}")
+        logger.info("已重置为默认模型: %s", self.current_model)
 
     async def get_chat_response(self, messages: List[Dict[str, Any]]) -> str:
         """
@@ -367,45 +1079,32 @@ class LLMInterface:
             生成的文本，如果发生错误则返回错误消息
         """
         try:
-            # 向客户端添加系统提醒（当消息数量大于3且不包含提醒时）
-            system_reminder = """记住：
-1. 你需要分析每个命令执行结果，特别注意错误和异常情况
-2. 注意观察SQL注入测试中的页面变化，包括空白页面和错误页面
-3. 必须正确解读ORDER BY测试的结果来确定列数
-4. 使用UNION SELECT确定哪些列可以回显数据
-5. 一旦获得关键信息，根据这些信息调整后续查询
-6. 所有分析和解释必须使用中文
-7. 你的输出必须是命令，每行一个，不要添加任何前缀
-8. 特别注意分析HTML代码，寻找验证码和隐藏字段
-9. 仔细分析页面结构和CSS类名，以便更精确地定位元素
-10. 观察HTML中的表单结构，确保正确识别所有输入字段尤其是验证码字段
-"""
-            
-            # 检查是否已经有系统提醒消息
-            has_reminder = False
-            for msg in messages:
-                if msg.get("role") == "system" and "记住：" in str(msg.get("content", "")):
-                    has_reminder = True
-                    break
+            # 检查是否已经有系统提醒消息（只检查字符串内容，避免把多模态列表转成字符串）
+            has_reminder = any(
+                msg.get("role") == "system"
+                and isinstance(msg.get("content"), str)
+                and "记住：" in msg["content"]
+                for msg in messages
+            )
             
-            # 如果消息数量大于3且没有系统提醒，添加一个
-            messages_with_reminder = messages.copy()
+            # 如果消息数量大于3且没有系统提醒，插入在第二个位置（通常系统提示之后），否则直接使用原列表
             if len(messages) > 3 and not has_reminder:
-                # 插入在第二个位置（通常系统提示之后）
-                messages_with_reminder.insert(1, {"role": "system", "content": system_reminder})
+                reminder = _SYSTEM_REMINDER_CACHED if self.provider_supports_prompt_cache else _SYSTEM_REMINDER
+                messages_with_reminder = [messages[0], reminder, *messages[1:]]
             else:
                 messages_with_reminder = messages
             
             # 记录请求信息
-            request_id = f"req-{int(time.time())}"
-            logger.info(f"[{request_id}] 发送聊天请求，消息数量: {len(messages_with_reminder)}")
+            request_id = f"req-{uuid.uuid4().hex[:8]}"
+            logger.info("[%s] 发送聊天请求，消息数量: %s", request_id, len(messages_with_reminder))
             
             # 记录消息总大小
-            total_chars = sum(len(str(msg.get("content", ""))) for msg in messages_with_reminder)
-            logger.info(f"[{request_id}] 总字符数: {total_chars}")
+            if logger.isEnabledFor(logging.INFO):
+                total_chars = sum(_content_len(msg.get("content")) for msg in messages_with_reminder)
+                logger.info("[%s] 总字符数: %s", request_id, total_chars)
             
-            # 获取聊天补全
-            content = self.chat_completion(
+            # 获取聊天补全（异步调用，不阻塞事件循环）
+            content = await self.achat_completion(
                 messages=messages_with_reminder,
                 max_tokens=1024,
                 temperature=0.3
@@ -413,18 +1112,19 @@ class LLMInterface:
             
             # 如果响应为空，返回默认消息
             if not content:
-                logger.error(f"[{request_id}] LLM返回了空内容")
+                logger.error("[%s] LLM返回了空内容", request_id)
                 return "SCREENSHOT\nTHINK API返回了空内容，需要检查API配置"
             
             # 记录响应内容
-            logger.info(f"[{request_id}] 接收到响应，长度: {len(content)}字符")
-            logger.info(f"[{request_id}] 响应内容(截断):\n{content[:500]}..." + ("" if len(content) <= 500 else f"\n... 截断，完整长度: {len(content)}字符"))
+            logger.info("[%s] 接收到响应，长度: %s字符", request_id, len(content))
+            if logger.isEnabledFor(logging.INFO):
+                truncated_note = "" if len(content) <= 500 else f"\n... 截断，完整长度: {len(content)}字符"
+                logger.info("[%s] 响应内容(截断):\n%s...%s", request_id, content[:500], truncated_note)
             
             return content
                 
         except Exception as e:
-            logger.error(f"获取聊天响应出错: {str(e)}")
-            import traceback
+            logger.error("获取聊天响应出错: %s", e)
             traceback.print_exc()
             
             # 返回错误信息作为响应
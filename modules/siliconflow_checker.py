@@ -8,15 +8,22 @@ SiliconFlow API检查器
 
 import json
 import socket
+import threading
 import time
 import urllib.parse
 import os
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple, Union
 
 import requests
 from openai import OpenAI
 
+from modules.http_client import get_http_client
+
+# DNS解析结果的缓存时间（秒）
+DNS_CACHE_TTL = 300
+
 class SiliconFlowChecker:
     """SiliconFlow API连接检查器"""
     
@@ -32,6 +39,22 @@ class SiliconFlowChecker:
         self.base_url = base_url
         self.timeout = 30  # 默认超时时间（秒）
         
+        # 共享的keep-alive HTTP客户端，所有模型测试复用同一连接池
+        self.http_client = get_http_client()
+        
+        # 所有模型测试共用一个OpenAI客户端；超时在每次请求时按self.timeout传入，
+        # 创建检查器后修改timeout仍然生效
+        self.client = OpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=self.http_client
+        )
+        
+        # DNS缓存: 主机名 -> (IP地址列表, 过期时间)
+        self._dns_cache = {}
+        # 并行的DNS检查和TCP检查共用一次解析，后到的线程等待并直接使用缓存
+        self._dns_lock = threading.Lock()
+        
         # 推荐模型列表
         self.recommended_models = [
             "deepseek-ai/DeepSeek-V3", 
@@ -43,6 +66,27 @@ class SiliconFlowChecker:
         # 存储测试结果
         self.test_results = {}
         
+    def _resolve_host(self, hostname: str) -> List[str]:
+        """
+        解析主机名，结果在DNS_CACHE_TTL内复用
+        
+        Args:
+            hostname: 主机名
+            
+        Returns:
+            按getaddrinfo顺序排列的全部IP地址（IPv4和IPv6）
+        """
+        with self._dns_lock:
+            cached = self._dns_cache.get(hostname)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+            
+            addresses = list(dict.fromkeys(
+                info[4][0] for info in socket.getaddrinfo(hostname, None, type=socket.SOCK_STREAM)
+            ))
+            self._dns_cache[hostname] = (addresses, time.monotonic() + DNS_CACHE_TTL)
+            return addresses
+    
     def check_dns_resolution(self, hostname: str = None) -> Tuple[bool, str]:
         """
         检查DNS解析
@@ -58,11 +102,11 @@ class SiliconFlowChecker:
             
         print(f"检查DNS解析: {hostname}")
         try:
-            start_time = time.time()
-            ip_address = socket.gethostbyname(hostname)
-            resolution_time = time.time() - start_time
+            start_time = time.perf_counter()
+            addresses = self._resolve_host(hostname)
+            resolution_time = time.perf_counter() - start_time
             
-            return True, f"DNS解析成功: {hostname} -> {ip_address} (耗时: {resolution_time:.2f}秒)"
+            return True, f"DNS解析成功: {hostname} -> {', '.join(addresses)} (耗时: {resolution_time:.2f}秒)"
         except socket.gaierror as e:
             return False, f"DNS解析失败: {hostname}, 错误: {str(e)}"
     
@@ -82,13 +126,60 @@ class SiliconFlowChecker:
             
         print(f"检查TCP连接: {hostname}:{port}")
         try:
-            start_time = time.time()
-            with socket.create_connection((hostname, port), timeout=10) as sock:
-                connection_time = time.time() - start_time
-                return True, f"TCP连接成功: {hostname}:{port} (耗时: {connection_time:.2f}秒)"
+            start_time = time.perf_counter()
+            # 使用缓存的解析结果，避免重复DNS查询；与create_connection一样依次尝试每个地址，
+            # 例如IPv6地址不可达时回退到IPv4
+            last_error = None
+            for ip_address in self._resolve_host(hostname):
+                try:
+                    with socket.create_connection((ip_address, port), timeout=10):
+                        connection_time = time.perf_counter() - start_time
+                        return True, f"TCP连接成功: {hostname}:{port} ({ip_address}, 耗时: {connection_time:.2f}秒)"
+                except (socket.timeout, socket.error) as e:
+                    last_error = e
+            return False, f"TCP连接失败: {hostname}:{port}, 错误: {str(last_error)}"
         except (socket.timeout, socket.error) as e:
             return False, f"TCP连接失败: {hostname}:{port}, 错误: {str(e)}"
     
+    def check_models_endpoint(self, timeout: int = 5) -> Tuple[bool, str]:
+        """
+        通过获取模型列表快速检查API是否可达
+        
+        Args:
+            timeout: 超时时间（秒），默认较短以便快速失败
+        
+        Returns:
+            (成功状态, 结果消息)
+        """
+        url = self.base_url.rstrip('/') + "/models"
+        print(f"检查API可达性: {url}")
+        try:
+            start_time = time.perf_counter()
+            response = requests.get(
+                url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=timeout
+            )
+            elapsed_time = time.perf_counter() - start_time
+            # 只要服务器有HTTP响应就说明网络可达，鉴权等问题交给后续的模型测试判断
+            return True, f"API可达: HTTP {response.status_code} (耗时: {elapsed_time:.2f}秒)"
+        except requests.RequestException as e:
+            return False, f"API不可达: {url}, 错误: {str(e)}"
+    
+    def prewarm_connection(self) -> bool:
+        """
+        预热共享HTTP客户端的连接，提前完成TLS握手，后续模型测试直接复用该连接
+        
+        Returns:
+            是否成功建立连接
+        """
+        try:
+            self.http_client.head(self.base_url.rstrip('/') + "/models", timeout=10)
+            return True
+        except Exception as e:
+            print(f"预热连接失败: {str(e)}")
+            return False
+    
     def test_model_connection(self, model_name: str) -> Tuple[bool, Dict]:
         """
         测试指定模型的连接
@@ -109,31 +200,25 @@ class SiliconFlowChecker:
         
         print(f"\n测试模型: {model_name}")
         
-        # 创建OpenAI客户端
-        client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url,
-            timeout=self.timeout
-        )
-        
         # 准备测试请求
         messages = [
             {"role": "system", "content": "You are a helpful assistant designed to output JSON."},
             {"role": "user", "content": "返回一个简单的JSON，包含字段：success和message，值都是字符串。"}
         ]
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
-            response = client.chat.completions.create(
+            response = self.client.chat.completions.create(
                 model=model_name,
                 messages=messages,
                 response_format={"type": "json_object"},
                 max_tokens=100,
-                temperature=0
+                temperature=0,
+                timeout=self.timeout
             )
             
             # 更新结果
-            result["time_taken"] = time.time() - start_time
+            result["time_taken"] = time.perf_counter() - start_time
             result["status"] = "成功"
             result["response"] = response.choices[0].message.content
             
@@ -144,7 +229,7 @@ class SiliconFlowChecker:
             
         except Exception as e:
             # 更新结果
-            result["time_taken"] = time.time() - start_time
+            result["time_taken"] = time.perf_counter() - start_time
             result["error"] = str(e)
             
             print(f"✗ 连接模型失败: {model_name}")
@@ -161,9 +246,12 @@ class SiliconFlowChecker:
         """
         print(f"开始测试所有推荐的SiliconFlow模型...")
         
-        # 先检查DNS和TCP连接
-        dns_result = self.check_dns_resolution()
-        tcp_result = self.check_tcp_connection()
+        # 先检查DNS和TCP连接（两项检查互不依赖，并行执行）
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            dns_future = executor.submit(self.check_dns_resolution)
+            tcp_future = executor.submit(self.check_tcp_connection)
+            dns_result = dns_future.result()
+            tcp_result = tcp_future.result()
         
         # 如果基础连接失败，返回结果
         if not dns_result[0] or not tcp_result[0]:
@@ -174,12 +262,19 @@ class SiliconFlowChecker:
                 "successful_models": []
             }
         
+        # 预先建立keep-alive连接，各模型测试无需再次握手
+        self.prewarm_connection()
+        
         # 测试所有推荐模型
         successful_models = []
         all_results = {}
         
-        for model in self.recommended_models:
-            success, result = self.test_model_connection(model)
+        # 各模型测试是独立的网络请求，并行执行，总耗时取决于最慢的一个
+        # executor.map保持输入顺序，成功模型列表仍按推荐优先级排列
+        with ThreadPoolExecutor(max_workers=len(self.recommended_models) or 1) as executor:
+            model_results = list(executor.map(self.test_model_connection, self.recommended_models))
+        
+        for model, (success, result) in zip(self.recommended_models, model_results):
             all_results[model] = result
             if success:
                 successful_models.append(model)
@@ -1,32 +1,248 @@
 from typing import List, Dict, Optional, Any
 from playwright.async_api import Page
 import re
+from urllib.parse import urljoin, urlsplit
 
-class FormElement:
+# 可选：安装pyahocorasick时使用Aho-Corasick自动机匹配技术栈关键字
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# 将单个表单节点序列化为字典（包括输入元素和提交按钮），只读取原始属性值
+# 提交按钮在浏览器端直接用DOM查找，不再为每个表单解析Playwright的:has-text选择器
+_SERIALIZE_FORM_JS = """
+    (() => {
+        const submitKeywords = ['submit', '登录', 'login'];
+        const findSubmit = form => {
+            const submit = form.querySelector('input[type="submit"], button[type="submit"]');
+            if (submit) {
+                return submit;
+            }
+            for (const button of form.getElementsByTagName('button')) {
+                const text = button.textContent.toLowerCase();
+                if (submitKeywords.some(keyword => text.includes(keyword))) {
+                    return button;
+                }
+            }
+            return null;
+        };
+        return form => {
+            const submit = findSubmit(form);
+            return {
+                id: form.getAttribute('id') || '',
+                action: form.getAttribute('action') || '',
+                method: form.getAttribute('method') || 'GET',
+                inputs: Array.from(form.querySelectorAll('input, textarea, select')).map(input => ({
+                    id: input.getAttribute('id') || '',
+                    name: input.getAttribute('name') || '',
+                    type: input.getAttribute('type') || 'text',
+                    placeholder: input.getAttribute('placeholder') || '',
+                    value: input.getAttribute('value') || ''
+                })),
+                submitId: submit ? (submit.getAttribute('id') || '') : null
+            };
+        };
+    })()
+"""
+
+# 将单个链接节点序列化为字典
+_SERIALIZE_LINK_JS = """
+    link => ({
+        href: link.getAttribute('href') || '',
+        text: link.innerText || '',
+        id: link.getAttribute('id') || ''
+    })
+"""
+
+# 读取导航请求的Server-Timing信息
+_SERVER_TIMING_JS = """
+    () => {
+        try {
+            const perfEntries = performance.getEntriesByType('navigation');
+            if (perfEntries && perfEntries.length > 0) {
+                return perfEntries[0].serverTiming;
+            }
+        } catch (e) {}
+        return null;
+    }
+"""
+
+# 一次遍历DOM同时收集表单和链接，并取回页面HTML和Server-Timing信息
+_EXTRACT_ALL_JS = f"""
+    () => {{
+        const serializeForm = {_SERIALIZE_FORM_JS};
+        const serializeLink = {_SERIALIZE_LINK_JS};
+        const forms = [];
+        const links = [];
+        for (const node of document.querySelectorAll('form, a[href]')) {{
+            if (node.matches('form')) {{
+                forms.push(serializeForm(node));
+            }} else {{
+                links.push(serializeLink(node));
+            }}
+        }}
+        return {{
+            forms,
+            links,
+            html: document.documentElement.outerHTML,
+            serverTiming: ({_SERVER_TIMING_JS})()
+        }};
+    }}
+"""
+
+# 页面内容中的技术栈特征：(类别, 技术名称, 特征关键字)
+_TECH_SIGNATURES = (
+    # 常见前端框架
+    ("frontend", "React", ("react", "reactjs")),
+    ("frontend", "Vue.js", ("vue", "vuejs")),
+    ("frontend", "Angular", ("angular",)),
+    ("frontend", "jQuery", ("jquery",)),
+    ("frontend", "Bootstrap", ("bootstrap",)),
+    # 后端技术
+    ("backend", "PHP", ("php", "wordpress", "laravel", "symfony")),
+    ("backend", "ASP.NET", ("asp.net", ".aspx", ".asmx")),
+    ("backend", "Node.js", ("node.js", "express", "nextjs")),
+    ("backend", "Python", ("django", "flask", "python")),
+    ("backend", "Ruby", ("ruby", "rails")),
+    ("backend", "Java", ("java", "spring", "struts")),
+    # 数据库
+    ("database", "MySQL", ("mysql", "mariadb")),
+    ("database", "PostgreSQL", ("postgresql", "postgres")),
+    ("database", "MongoDB", ("mongodb",)),
+    ("database", "Microsoft SQL Server", ("mssql", "sqlserver")),
+    ("database", "Oracle", ("oracle",)),
+    # 框架
+    ("framework", "WordPress", ("wordpress",)),
+    ("framework", "Drupal", ("drupal",)),
+    ("framework", "Joomla", ("joomla",)),
+    ("framework", "Laravel", ("laravel",)),
+    ("framework", "Django", ("django",))
+)
+
+def _build_keyword_map(entries) -> Dict[str, tuple]:
+    """将(命中目标, 关键字列表)展开为 关键字 -> 命中目标元组 的映射（同一关键字可能对应多个目标）"""
+    keyword_map = {}
+    for target, keywords in entries:
+        for keyword in keywords:
+            keyword_map.setdefault(keyword, []).append(target)
+    return {keyword: tuple(targets) for keyword, targets in keyword_map.items()}
+
+def _compile_keyword_re(keywords, flags: int = 0) -> re.Pattern:
+    """
+    将字面量关键字合并成一个预编译的正则，一次扫描找出全部关键字
+    
+    使用零宽前瞻，使相互重叠的关键字（例如mysqlserver中的mysql和sqlserver）都能被匹配到，
+    匹配到的关键字在group(1)中
+    """
+    alternation = "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+    return re.compile(f"(?=({alternation}))", flags)
+
+# 特征关键字 -> 命中的(类别, 技术名称)元组（例如django同时对应Python和Django）
+_TECH_KEYWORD_MAP = _build_keyword_map(((category, label), keywords) for category, label, keywords in _TECH_SIGNATURES)
+_TECH_RE = _compile_keyword_re(_TECH_KEYWORD_MAP, re.IGNORECASE)
+
+# 关键字都是字面量，Aho-Corasick自动机一次线性扫描即可找出全部（包括重叠的）关键字，与关键字数量无关
+def _build_automaton(keyword_map: Dict[str, tuple]):
+    """用关键字映射构建Aho-Corasick自动机，匹配结果为关键字对应的命中目标元组"""
+    automaton = ahocorasick.Automaton()
+    for keyword, targets in keyword_map.items():
+        automaton.add_word(keyword, targets)
+    automaton.make_automaton()
+    return automaton
+
+_TECH_AUTOMATON = _build_automaton(_TECH_KEYWORD_MAP) if AHOCORASICK_AVAILABLE else None
+
+# 技术栈特征几乎都出现在<head>和<body>开头，只扫描HTML的前512K字符，限制超大页面的最坏扫描开销
+# 特征关键字均为字面量，不使用相邻或嵌套的量词（如.*.*），扫描时间与长度成线性关系
+_TECH_SCAN_LIMIT = 512 * 1024
+
+# 分块扫描HTML时每块的字符数，相邻块重叠(最长关键字长度-1)个字符以免漏掉跨块的关键字
+_TECH_SCAN_CHUNK = 65536
+_TECH_SCAN_OVERLAP = max(len(keyword) for keyword in _TECH_KEYWORD_MAP) - 1
+
+# 可识别的全部技术，全部命中后提前结束扫描
+_TECH_ALL = {target for targets in _TECH_KEYWORD_MAP.values() for target in targets}
+
+def _scan_technologies(html_content: str) -> set:
+    """扫描一遍HTML，返回命中的(类别, 技术名称)集合"""
+    detected = set()
+    scan_end = min(len(html_content), _TECH_SCAN_LIMIT)
+    if _TECH_AUTOMATON is not None:
+        # 分块转换小写后送入自动机，不生成整个HTML的小写副本
+        for start in range(0, scan_end, _TECH_SCAN_CHUNK):
+            chunk = html_content[max(0, start - _TECH_SCAN_OVERLAP):min(start + _TECH_SCAN_CHUNK, scan_end)].lower()
+            for _, targets in _TECH_AUTOMATON.iter(chunk):
+                detected.update(targets)
+            if len(detected) == len(_TECH_ALL):
+                break
+    else:
+        for match in _TECH_RE.finditer(html_content, 0, scan_end):
+            detected.update(_TECH_KEYWORD_MAP[match.group(1).lower()])
+            if len(detected) == len(_TECH_ALL):
+                break
+    return detected
+
+# 用户名输入框名称中常见的关键字
+_USERNAME_KEYWORDS = ("user", "login", "email", "name", "account")
+
+# 需要检查漏洞的输入框类型（文本输入和隐藏输入）
+_VULN_INPUT_TYPES = frozenset(["text", "hidden", "search", "url", "textarea"])
+
+# 输入框名称中的关键字提示的漏洞类型，按检查顺序排列
+_VULN_SIGNATURES = (
+    ("sql_injection", ("id", "user", "name", "pass", "key", "search", "query")),
+    ("xss", ("comment", "message", "content", "description", "text")),
+    ("command_injection", ("cmd", "command", "exec", "run", "ping", "query"))
+)
+
+# 关键字 -> 漏洞类型元组（例如query同时提示SQL注入和命令注入）
+_VULN_KEYWORD_MAP = _build_keyword_map(_VULN_SIGNATURES)
+_VULN_RE = _compile_keyword_re(_VULN_KEYWORD_MAP)
+
+class _CachedDictElement:
+    """缓存to_dict结果的页面元素基类，任何属性被重新赋值时缓存失效"""
+    # 页面元素数量可能很多，使用__slots__减少每个实例的内存占用
+    __slots__ = ("_dict_cache",)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if name != "_dict_cache":
+            object.__setattr__(self, "_dict_cache", None)
+
+class FormElement(_CachedDictElement):
     """表单元素类"""
+    __slots__ = ("id", "action", "method", "inputs", "is_login_form", "is_file_upload", "selectors")
+    
     def __init__(self, form_id: str = "", form_action: str = "", form_method: str = "GET"):
         self.id = form_id
         self.action = form_action
         self.method = form_method
         self.inputs = []  # 表单中的输入元素
         self.is_login_form = False  # 是否是登录表单
+        self.is_file_upload = False  # 是否是文件上传表单
         self.selectors = {
             "form": "",
             "submit": ""
         }
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "id": self.id,
-            "action": self.action,
-            "method": self.method,
-            "inputs": self.inputs,
-            "is_login_form": self.is_login_form,
-            "selectors": self.selectors
-        }
+        if self._dict_cache is None:
+            self._dict_cache = {
+                "id": self.id,
+                "action": self.action,
+                "method": self.method,
+                "inputs": self.inputs,
+                "is_login_form": self.is_login_form,
+                "selectors": self.selectors
+            }
+        return self._dict_cache
 
-class InputElement:
+class InputElement(_CachedDictElement):
     """输入元素类"""
+    __slots__ = ("id", "_name", "_name_lower", "type", "placeholder", "value", "selector", "is_vulnerable", "vulnerability_types")
+    
     def __init__(self, element_id: str = "", element_name: str = "", element_type: str = "text"):
         self.id = element_id
         self.name = element_name
@@ -37,20 +253,34 @@ class InputElement:
         self.is_vulnerable = False  # 是否可能存在漏洞
         self.vulnerability_types = []  # 可能存在的漏洞类型
     
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    @name.setter
+    def name(self, value: str) -> None:
+        # 同时保存小写形式，关键字匹配时无需重复调用lower()
+        self._name = value
+        self._name_lower = value.lower() if value else ""
+    
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "id": self.id,
-            "name": self.name,
-            "type": self.type,
-            "placeholder": self.placeholder,
-            "value": self.value,
-            "selector": self.selector,
-            "is_vulnerable": self.is_vulnerable,
-            "vulnerability_types": self.vulnerability_types
-        }
+        if self._dict_cache is None:
+            self._dict_cache = {
+                "id": self.id,
+                "name": self.name,
+                "type": self.type,
+                "placeholder": self.placeholder,
+                "value": self.value,
+                "selector": self.selector,
+                "is_vulnerable": self.is_vulnerable,
+                "vulnerability_types": self.vulnerability_types
+            }
+        return self._dict_cache
 
-class LinkElement:
+class LinkElement(_CachedDictElement):
     """链接元素类"""
+    __slots__ = ("href", "text", "selector", "is_visited")
+    
     def __init__(self, href: str = "", text: str = ""):
         self.href = href
         self.text = text
@@ -58,12 +288,14 @@ class LinkElement:
         self.is_visited = False
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "href": self.href,
-            "text": self.text,
-            "selector": self.selector,
-            "is_visited": self.is_visited
-        }
+        if self._dict_cache is None:
+            self._dict_cache = {
+                "href": self.href,
+                "text": self.text,
+                "selector": self.selector,
+                "is_visited": self.is_visited
+            }
+        return self._dict_cache
 
 class SiteAnalyzer:
     """网站结构分析器，用于自动发现和分类网站元素"""
@@ -75,11 +307,11 @@ class SiteAnalyzer:
         self.authentication_forms = []  # 认证表单
         self.file_upload_forms = []  # 文件上传表单
         self.api_endpoints = []  # API端点
-        self.technologies = {  # 检测到的技术栈
-            "frontend": [],
-            "backend": [],
-            "database": [],
-            "framework": []
+        self.technologies = {  # 检测到的技术栈（集合去重，返回时转换为列表）
+            "frontend": set(),
+            "backend": set(),
+            "database": set(),
+            "framework": set()
         }
         self.visited_urls = set()  # 已访问URL集合
         self.base_url = ""  # 基础URL
@@ -91,14 +323,17 @@ class SiteAnalyzer:
         self.base_url = self._extract_base_url(current_url)
         self.visited_urls.add(current_url)
         
+        # 一次浏览器往返取回表单、链接和页面HTML，避免多次遍历DOM
+        page_data = await self._extract_all(page)
+        
         # 分析表单和输入元素
-        await self._analyze_forms(page)
+        self._populate_forms(page_data["forms"])
         
         # 分析链接
-        await self._analyze_links(page)
+        self._populate_links(page_data["links"], current_url)
         
         # 识别技术栈
-        await self.identify_technology(page)
+        self.identify_technology_from_html(page_data["html"], page_data["serverTiming"])
         
         # 返回分析结果摘要
         return {
@@ -107,22 +342,18 @@ class SiteAnalyzer:
             "links_count": len(self.links),
             "auth_forms_count": len(self.authentication_forms),
             "file_upload_forms_count": len(self.file_upload_forms),
-            "technologies": self.technologies
+            "technologies": self._technologies_as_lists()
         }
     
-    async def _analyze_forms(self, page: Page) -> None:
-        """分析页面中的表单元素"""
-        # 获取页面上所有表单
-        form_handles = await page.query_selector_all('form')
-        
-        for form_handle in form_handles:
+    async def _extract_all(self, page: Page) -> Dict[str, Any]:
+        """一次遍历DOM，取回表单、链接、页面HTML和Server-Timing信息"""
+        return await page.evaluate(_EXTRACT_ALL_JS)
+    
+    def _populate_forms(self, forms_data: List[Dict[str, Any]]) -> None:
+        """根据浏览器端序列化的表单数据创建表单和输入元素"""
+        for form_data in forms_data:
             # 创建新的表单元素
-            form = FormElement()
-            
-            # 获取表单属性
-            form.id = await form_handle.get_attribute('id') or ""
-            form.action = await form_handle.get_attribute('action') or ""
-            form.method = (await form_handle.get_attribute('method') or "GET").upper()
+            form = FormElement(form_data["id"], form_data["action"], form_data["method"].upper())
             
             # 创建表单选择器
             if form.id:
@@ -132,23 +363,15 @@ class SiteAnalyzer:
                 form_idx = len(self.forms)
                 form.selectors["form"] = f"form:nth-of-type({form_idx + 1})"
             
-            # 获取表单内的输入元素
-            input_handles = await form_handle.query_selector_all('input, textarea, select')
-            
             password_input_found = False
             username_input_found = False
             file_input_found = False
             
-            for input_handle in input_handles:
+            for input_data in form_data["inputs"]:
                 # 创建新的输入元素
-                input_elem = InputElement()
-                
-                # 获取输入元素属性
-                input_elem.id = await input_handle.get_attribute('id') or ""
-                input_elem.name = await input_handle.get_attribute('name') or ""
-                input_elem.type = await input_handle.get_attribute('type') or "text"
-                input_elem.placeholder = await input_handle.get_attribute('placeholder') or ""
-                input_elem.value = await input_handle.get_attribute('value') or ""
+                input_elem = InputElement(input_data["id"], input_data["name"], input_data["type"])
+                input_elem.placeholder = input_data["placeholder"]
+                input_elem.value = input_data["value"]
                 
                 # 创建输入元素选择器
                 if input_elem.id:
@@ -165,7 +388,7 @@ class SiteAnalyzer:
                     password_input_found = True
                 
                 # 检查是否可能是用户名输入框
-                if input_elem.type == "text" and any(keyword in (input_elem.name or "").lower() for keyword in ["user", "login", "email", "name", "account"]):
+                if input_elem.type == "text" and any(keyword in input_elem._name_lower for keyword in _USERNAME_KEYWORDS):
                     username_input_found = True
                 
                 # 检查是否是文件上传输入框
@@ -179,12 +402,10 @@ class SiteAnalyzer:
                 # 同时也添加到全局输入点集合
                 self.inputs.append(input_elem)
             
-            # 查找表单提交按钮
-            submit_button = await form_handle.query_selector('input[type="submit"], button[type="submit"], button:has-text("Submit"), button:has-text("登录"), button:has-text("Login")')
-            if submit_button:
-                button_id = await submit_button.get_attribute('id') or ""
-                if button_id:
-                    form.selectors["submit"] = f"#{button_id}"
+            # 设置表单提交按钮选择器
+            if form_data["submitId"] is not None:
+                if form_data["submitId"]:
+                    form.selectors["submit"] = f"#{form_data['submitId']}"
                 else:
                     form.selectors["submit"] = f"{form.selectors['form']} input[type='submit'], {form.selectors['form']} button[type='submit']"
             
@@ -200,21 +421,17 @@ class SiteAnalyzer:
             # 添加表单到集合
             self.forms.append(form)
     
-    async def _analyze_links(self, page: Page) -> None:
-        """分析页面中的链接元素"""
-        # 获取页面上所有链接
-        link_handles = await page.query_selector_all('a[href]')
+    def _populate_links(self, links_data: List[Dict[str, str]], page_url: str) -> None:
+        """根据链接数据（href、text、id）创建链接元素，只保留同域名的内部链接"""
+        # 基础URL的主机部分只解析一次
+        base_netloc = urlsplit(self.base_url).netloc
         
-        for link_handle in link_handles:
+        for link_data in links_data:
             # 创建新的链接元素
-            link = LinkElement()
-            
-            # 获取链接属性
-            link.href = await link_handle.get_attribute('href') or ""
-            link.text = await link_handle.inner_text() or ""
+            link = LinkElement(link_data["href"], link_data["text"])
             
             # 创建链接选择器
-            link_id = await link_handle.get_attribute('id') or ""
+            link_id = link_data["id"]
             if link_id:
                 link.selector = f"a#{link_id}"
             elif link.text:
@@ -226,130 +443,65 @@ class SiteAnalyzer:
             
             # 只添加有效的内部链接
             if link.href and not link.href.startswith('#') and not link.href.startswith('javascript:'):
-                # 转换为绝对URL
-                if not link.href.startswith('http'):
-                    if link.href.startswith('/'):
-                        link.href = f"{self.base_url}{link.href}"
-                    else:
-                        link.href = f"{self.base_url}/{link.href}"
+                # 相对当前页面转换为绝对URL（正确处理//开头、?开头和../等相对链接）
+                link.href = urljoin(page_url, link.href)
                 
-                # 检查是否是同一域名的链接
-                if self.base_url in link.href:
+                # 按主机名判断是否是同一域名的链接，避免查询参数中包含基础URL时误判
+                if base_netloc and urlsplit(link.href).netloc == base_netloc:
                     self.links.append(link)
     
-    async def identify_technology(self, page: Page) -> Dict[str, List[str]]:
-        """识别网站使用的技术栈"""
-        # 从HTML识别前端技术
-        html_content = await page.content()
-        
-        # 检查常见前端框架
-        if re.search(r'react|reactjs', html_content, re.IGNORECASE):
-            self.technologies["frontend"].append("React")
-        if re.search(r'vue|vuejs', html_content, re.IGNORECASE):
-            self.technologies["frontend"].append("Vue.js")
-        if re.search(r'angular', html_content, re.IGNORECASE):
-            self.technologies["frontend"].append("Angular")
-        if re.search(r'jquery', html_content, re.IGNORECASE):
-            self.technologies["frontend"].append("jQuery")
-        if re.search(r'bootstrap', html_content, re.IGNORECASE):
-            self.technologies["frontend"].append("Bootstrap")
-        
-        # 检查后端技术
-        server_header = await page.evaluate("""
-            () => {
-                try {
-                    const perfEntries = performance.getEntriesByType('navigation');
-                    if (perfEntries && perfEntries.length > 0) {
-                        return perfEntries[0].serverTiming;
-                    }
-                } catch (e) {}
-                return null;
-            }
-        """)
+    def identify_technology_from_html(self, html_content: str, server_header: Any = None) -> Dict[str, List[str]]:
+        """根据页面HTML和Server-Timing信息识别网站使用的技术栈"""
+        # 一次扫描HTML收集命中的技术
+        detected = _scan_technologies(html_content)
         
         # 从响应头识别服务器类型
         if server_header:
-            if 'Apache' in str(server_header):
-                self.technologies["backend"].append("Apache")
-            if 'nginx' in str(server_header):
-                self.technologies["backend"].append("Nginx")
-            if 'IIS' in str(server_header):
-                self.technologies["backend"].append("IIS")
+            server_text = str(server_header)
+            if 'Apache' in server_text:
+                detected.add(("backend", "Apache"))
+            if 'nginx' in server_text:
+                detected.add(("backend", "Nginx"))
+            if 'IIS' in server_text:
+                detected.add(("backend", "IIS"))
         
-        # 检查网页内容中的线索
-        if re.search(r'php|wordpress|laravel|symfony', html_content, re.IGNORECASE):
-            self.technologies["backend"].append("PHP")
-        if re.search(r'asp\.net|\.aspx|\.asmx', html_content, re.IGNORECASE):
-            self.technologies["backend"].append("ASP.NET")
-        if re.search(r'node\.js|express|nextjs', html_content, re.IGNORECASE):
-            self.technologies["backend"].append("Node.js")
-        if re.search(r'django|flask|python', html_content, re.IGNORECASE):
-            self.technologies["backend"].append("Python")
-        if re.search(r'ruby|rails', html_content, re.IGNORECASE):
-            self.technologies["backend"].append("Ruby")
-        if re.search(r'java|spring|struts', html_content, re.IGNORECASE):
-            self.technologies["backend"].append("Java")
+        # 按类别记录，集合自动跳过已经识别过的技术
+        for category, label in detected:
+            self.technologies[category].add(label)
         
-        # 检查数据库线索
-        if re.search(r'mysql|mariadb', html_content, re.IGNORECASE):
-            self.technologies["database"].append("MySQL")
-        if re.search(r'postgresql|postgres', html_content, re.IGNORECASE):
-            self.technologies["database"].append("PostgreSQL")
-        if re.search(r'mongodb', html_content, re.IGNORECASE):
-            self.technologies["database"].append("MongoDB")
-        if re.search(r'mssql|sqlserver', html_content, re.IGNORECASE):
-            self.technologies["database"].append("Microsoft SQL Server")
-        if re.search(r'oracle', html_content, re.IGNORECASE):
-            self.technologies["database"].append("Oracle")
-        
-        # 检查框架线索
-        if re.search(r'wordpress', html_content, re.IGNORECASE):
-            self.technologies["framework"].append("WordPress")
-        if re.search(r'drupal', html_content, re.IGNORECASE):
-            self.technologies["framework"].append("Drupal")
-        if re.search(r'joomla', html_content, re.IGNORECASE):
-            self.technologies["framework"].append("Joomla")
-        if re.search(r'laravel', html_content, re.IGNORECASE):
-            self.technologies["framework"].append("Laravel")
-        if re.search(r'django', html_content, re.IGNORECASE):
-            self.technologies["framework"].append("Django")
-        
-        # 移除重复项
-        for category in self.technologies:
-            self.technologies[category] = list(set(self.technologies[category]))
-        
-        return self.technologies
+        return self._technologies_as_lists()
+    
+    def _technologies_as_lists(self) -> Dict[str, List[str]]:
+        """将各类别的技术集合转换为排序后的列表"""
+        return {category: sorted(labels) for category, labels in self.technologies.items()}
     
     def analyze_input_for_vulnerabilities(self) -> List[Dict[str, Any]]:
         """分析输入点可能存在的漏洞"""
         vulnerable_inputs = []
+        seen = set()
         
         for input_elem in self.inputs:
             # 只检查文本输入和隐藏输入
-            if input_elem.type not in ["text", "hidden", "search", "url", "textarea"]:
+            if input_elem.type not in _VULN_INPUT_TYPES:
                 continue
             
-            # 检查名称中的关键字，判断是否易受SQL注入攻击
-            if any(keyword in (input_elem.name or "").lower() for keyword in ["id", "user", "name", "pass", "key", "search", "query"]):
-                input_elem.is_vulnerable = True
-                input_elem.vulnerability_types.append("sql_injection")
-                vulnerable_inputs.append(input_elem.to_dict())
-            
-            # 检查是否可能存在XSS漏洞
-            if any(keyword in (input_elem.name or "").lower() for keyword in ["comment", "message", "content", "description", "text"]):
-                input_elem.is_vulnerable = True
-                input_elem.vulnerability_types.append("xss")
-                if input_elem.to_dict() not in vulnerable_inputs:
-                    vulnerable_inputs.append(input_elem.to_dict())
+            # 一次扫描名称，找出所有关键字提示的漏洞类型
+            hits = set()
+            for match in _VULN_RE.finditer(input_elem._name_lower):
+                hits.update(_VULN_KEYWORD_MAP[match.group(1)])
             
-            # 检查是否可能存在命令注入
-            if any(keyword in (input_elem.name or "").lower() for keyword in ["cmd", "command", "exec", "run", "ping", "query"]):
+            for vuln_type, _ in _VULN_SIGNATURES:
+                if vuln_type not in hits:
+                    continue
                 input_elem.is_vulnerable = True
-                input_elem.vulnerability_types.append("command_injection")
-                if input_elem.to_dict() not in vulnerable_inputs:
-                    vulnerable_inputs.append(input_elem.to_dict())
+                input_elem.vulnerability_types.append(vuln_type)
+                # 按对象标识去重，避免每次构造字典再线性比较
+                if id(input_elem) not in seen:
+                    seen.add(id(input_elem))
+                    vulnerable_inputs.append(input_elem)
         
-        return vulnerable_inputs
+        # 分析完成后统一转换为字典，每个输入点只序列化一次
+        return [input_elem.to_dict() for input_elem in vulnerable_inputs]
     
     def get_input_points(self) -> List[Dict[str, Any]]:
         """获取所有输入点"""
@@ -373,7 +525,15 @@ class SiteAnalyzer:
     
     def _extract_base_url(self, url: str) -> str:
         """从URL中提取基础URL"""
-        match = re.match(r'(https?://[^/]+)', url)
-        if match:
-            return match.group(1)
-        return url 
\ No newline at end of file
+        # 协议前缀固定，直接查找主机部分之后的第一个斜杠，无需正则
+        if url.startswith('http://'):
+            start = 7
+        elif url.startswith('https://'):
+            start = 8
+        else:
+            return url
+        end = url.find('/', start)
+        # 没有路径部分或主机名为空时原样返回
+        if end == -1 or end == start:
+            return url
+        return url[:end] 
\ No newline at end of file
@@ -1,8 +1,26 @@
 import os
+import copy
 import json
 import argparse
+import functools
 from typing import List, Dict, Optional, Any
 
+# 优先使用orjson解析和序列化配置（C实现，速度更快），未安装时回退到标准库
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+@functools.lru_cache(maxsize=8)
+def _read_config_data(path: str, mtime_ns: int) -> Dict[str, Any]:
+    """按(路径, 修改时间)缓存配置文件的解析结果，文件被修改后自动失效"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
 class TestConfig:
     """测试配置类，支持从命令行参数、配置文件和交互式配置中加载"""
     
@@ -22,15 +40,11 @@ class TestConfig:
         # 创建默认配置
         config = cls()
         
-        # 确保文件存在
-        if not os.path.exists(config_file):
-            print(f"[错误] 配置文件 {config_file} 不存在")
-            return config
-            
-        # 尝试加载JSON配置
+        # 尝试加载JSON配置（文件不存在时由os.stat抛出FileNotFoundError）
         try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
+            # 返回缓存结果的深拷贝，避免修改配置时影响缓存
+            mtime_ns = os.stat(config_file).st_mtime_ns
+            config_data = copy.deepcopy(_read_config_data(config_file, mtime_ns))
                 
             # 填充配置
             config.target_url = config_data.get('target_url', config.target_url)
@@ -44,6 +58,8 @@ class TestConfig:
             
             print(f"[成功] 从 {config_file} 加载配置")
             
+        except FileNotFoundError:
+            print(f"[错误] 配置文件 {config_file} 不存在")
         except Exception as e:
             print(f"[错误] 加载配置文件 {config_file} 失败: {str(e)}")
             
@@ -189,8 +205,13 @@ class TestConfig:
     def to_file(self, file_path: str) -> bool:
         """保存配置到文件"""
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.to_dict(), f, indent=2)
+            if ORJSON_AVAILABLE:
+                # orjson直接输出UTF-8字节，非ASCII字符不再转义为\uXXXX（两种格式json都能正确读取）
+                with open(file_path, 'wb') as f:
+                    f.write(orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2))
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.to_dict(), f, indent=2)
             print(f"[成功] 配置已保存到 {file_path}")
             return True
         except Exception as e:
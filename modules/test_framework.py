@@ -1,5 +1,112 @@
+import re
 import time
-from typing import List, Dict, Optional, Any, Tuple
+from collections import deque
+from typing import List, Dict, Optional, Any, Tuple, NamedTuple
+
+# 可选：安装pyahocorasick时使用Aho-Corasick自动机匹配命令关键字
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# 最多保留的测试发现数，避免长时间会话中无限增长
+MAX_DISCOVERIES = 128
+
+# 计划测试的漏洞类型，按记录发现的顺序排列
+_PLANNED_VULN_TERMS = ("sql注入", "xss", "csrf", "命令注入", "文件上传")
+
+# 命令关键字表：(类别, 关键字, 是否区分大小写)
+_COMMAND_SIGNATURES = (
+    ("captcha", ("验证码", "captcha"), False),
+    ("captcha_cn", ("验证码",), False),
+    ("captcha_error", ("验证码错误",), False),
+    ("csrf", ("csrf", "令牌", "token"), False),
+    ("login", ("登录",), False),
+    ("correct", ("正确",), False),
+    ("vuln", ("sql", "注入", "xss", "csrf", "漏洞"), False),
+    ("sql_payload", ("'", "\"", "--", "UNION", "SELECT"), True),
+    # 事件指导只针对脚本类XSS载荷，状态更新还把javascript:伪协议计为XSS测试
+    ("xss_payload", ("<script>", "alert", "onerror"), True),
+    ("xss_test", ("<script>", "alert", "onerror", "javascript:"), True),
+) + tuple((("plan", term), (term,), False) for term in _PLANNED_VULN_TERMS)
+
+def _build_keyword_map(signatures) -> Dict[str, tuple]:
+    """将关键字表展开为 小写关键字 -> ((类别, 原始关键字, 是否区分大小写), ...) 映射"""
+    keyword_map = {}
+    for category, keywords, case_sensitive in signatures:
+        for keyword in keywords:
+            keyword_map.setdefault(keyword.lower(), []).append((category, keyword, case_sensitive))
+    return {keyword: tuple(entries) for keyword, entries in keyword_map.items()}
+
+def _build_automaton(keyword_map: Dict[str, tuple]):
+    """用关键字映射构建Aho-Corasick自动机，匹配结果为关键字对应的条目元组"""
+    automaton = ahocorasick.Automaton()
+    for keyword, entries in keyword_map.items():
+        automaton.add_word(keyword, entries)
+    automaton.make_automaton()
+    return automaton
+
+def _compile_keyword_re(keyword_map: Dict[str, tuple]) -> Tuple[re.Pattern, Dict[str, tuple]]:
+    """
+    将关键字编译为一个正则（未安装pyahocorasick时使用）
+    
+    前瞻匹配使重叠的关键字都能命中；同一位置只会命中最长的关键字，
+    因此每个关键字的条目中合并了作为其前缀的关键字的条目（例如sql注入同时带上sql的条目）
+    
+    Returns:
+        (编译后的正则, 命中关键字 -> 条目元组)
+    """
+    keywords = sorted(keyword_map, key=len, reverse=True)
+    pattern = re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in keywords) + "))")
+    entries_map = {
+        keyword: tuple(entry for prefix in keywords if keyword.startswith(prefix) for entry in keyword_map[prefix])
+        for keyword in keywords
+    }
+    return pattern, entries_map
+
+_COMMAND_KEYWORD_MAP = _build_keyword_map(_COMMAND_SIGNATURES)
+_COMMAND_AUTOMATON = _build_automaton(_COMMAND_KEYWORD_MAP) if AHOCORASICK_AVAILABLE else None
+_COMMAND_RE, _COMMAND_RE_ENTRIES = _compile_keyword_re(_COMMAND_KEYWORD_MAP)
+
+# 只有这些命令类型的处理逻辑会用到关键字，其他命令（如GOTO、WAIT）无需扫描内容
+_KEYWORD_CMD_TYPES = frozenset(["THINK", "TYPE", "CLICK"])
+
+def _scan_command(cmd_content: str) -> set:
+    """命令内容只转换一次小写并扫描一遍，返回命中的关键字类别集合"""
+    if not cmd_content:
+        return set()
+    content_lower = cmd_content.lower()
+    if _COMMAND_AUTOMATON is not None:
+        matched = (entries for _, entries in _COMMAND_AUTOMATON.iter(content_lower))
+    else:
+        matched = (_COMMAND_RE_ENTRIES[match.group(1)] for match in _COMMAND_RE.finditer(content_lower))
+    
+    hits = set()
+    for entries in matched:
+        for category, keyword, case_sensitive in entries:
+            # 区分大小写的关键字（如UNION、<script>）需要在原始内容中再确认一次
+            if not case_sensitive or keyword in cmd_content:
+                hits.add(category)
+    return hits
+
+class SecurityMechanism(NamedTuple):
+    """已发现的安全机制"""
+    type: str
+    description: str
+    timestamp: float
+
+class InputPoint(NamedTuple):
+    """已识别的输入点"""
+    selector: str
+    context: str
+    timestamp: float
+
+class Discovery(NamedTuple):
+    """测试发现"""
+    description: str
+    phase: int
+    timestamp: float
 
 class TestFramework:
     """
@@ -13,57 +120,157 @@ class TestFramework:
     PHASE_PLANNING = 3   # 漏洞评估规划阶段
     PHASE_EXPLOIT = 4    # 漏洞验证利用阶段
     
+    # 长时间会话中按命令频繁访问这些属性，使用__slots__省去实例__dict__
+    __slots__ = (
+        "current_phase", "phase_progress", "security_mechanisms", "input_points",
+        "last_guidance_time", "guidance_interval", "_intro_sent", "discoveries",
+        "command_counter", "_initial_guidance_cache", "_phase_handlers", "_triggers", "_recon_count_msg"
+    )
+    
+    # 测试阶段名称
+    _PHASE_NAMES = {
+        PHASE_RECON: "信息收集",
+        PHASE_BASELINE: "基准建立",
+        PHASE_PLANNING: "漏洞评估",
+        PHASE_EXPLOIT: "漏洞验证"
+    }
+    
+    # 各阶段的指导信息
+    _GUIDANCE = {
+        PHASE_RECON: "全面观察网站结构和功能，识别安全机制，记录输入点",
+        PHASE_BASELINE: "验证核心功能是否正常工作，使用有效输入测试正常流程",
+        PHASE_PLANNING: "评估每个输入点的漏洞可能性，制定详细测试计划",
+        PHASE_EXPLOIT: "系统化执行测试计划，验证所有可能的漏洞"
+    }
+    
+    # 各阶段按进度(<30、<70、其余)发送的周期性指导消息
+    # None表示信息收集阶段的统计消息，内容随发现数量变化
+    _GUIDANCE_MESSAGES = {
+        PHASE_RECON: (
+            "[系统提示] 继续探索网站结构，确保不遗漏任何功能点",
+            "[系统提示] 特别注意隐藏的安全机制，如请求头中的令牌",
+            None
+        ),
+        PHASE_BASELINE: (
+            "[系统提示] 确保验证所有主要功能，而不仅仅是登录功能",
+            "[系统提示] 记录系统如何处理边界情况和无效输入",
+            "[系统提示] 注意验证码刷新机制和错误处理方式"
+        ),
+        PHASE_PLANNING: (
+            "[系统提示] 考虑不同类型的漏洞测试向量",
+            "[系统提示] 注意安全机制之间的相互作用",
+            "[系统提示] 记住规划测试顺序，从低风险测试开始"
+        ),
+        PHASE_EXPLOIT: (
+            "[系统提示] 保持对验证码等安全机制的正确处理",
+            "[系统提示] 系统化验证每个潜在漏洞",
+            "[系统提示] 记录每个测试的详细结果"
+        )
+    }
+    _DEFAULT_GUIDANCE_MESSAGES = ("[系统提示] 继续系统化测试",) * 3
+    
+    # 进入各阶段时发送的阶段介绍
+    _PHASE_INTROS = {
+        PHASE_BASELINE: """
+[系统] 进入基准建立阶段
+
+在这个阶段，您需要：
+1. 使用有效输入验证基本功能
+2. 特别注意验证码等安全机制的正确处理
+3. 记录正常响应和错误响应的特征
+
+请确保基本功能正常工作，再考虑漏洞测试。
+""",
+        PHASE_PLANNING: """
+[系统] 进入漏洞评估阶段
+
+在这个阶段，您需要：
+1. 分析每个输入点可能存在的漏洞
+2. 评估安全机制的有效性
+3. 按威胁程度排序可能的漏洞
+4. 制定详细的测试计划
+
+请系统思考每个可能的漏洞点，而不是随机测试。
+""",
+        PHASE_EXPLOIT: """
+[系统] 进入漏洞验证阶段
+
+在这个阶段，您需要：
+1. 系统执行测试计划
+2. 对每个输入点尝试适当的测试向量
+3. 同时正确处理验证码等安全机制
+4. 收集每个漏洞的证据
+
+请记住，漏洞测试需要在保持系统稳定的前提下进行。
+"""
+    }
+    
     def __init__(self):
         """初始化测试框架"""
         # 当前测试阶段
         self.current_phase = self.PHASE_RECON
         # 阶段进度(0-100)
         self.phase_progress = 0
-        # 已发现的安全机制
-        self.security_mechanisms = []
-        # 已识别的输入点
-        self.input_points = []
-        # 上次发送指导消息的时间
-        self.last_guidance_time = 0
+        # 已发现的安全机制: 机制类型 -> 机制信息
+        self.security_mechanisms = {}
+        # 已识别的输入点: 选择器 -> 输入点信息
+        self.input_points = {}
+        # 信息收集阶段的统计指导消息，新增安全机制或输入点时更新
+        self._update_recon_count_msg()
+        # 上次发送指导消息的时间（time.monotonic()，尚未发送时为负无穷）
+        self.last_guidance_time = float("-inf")
         # 指导消息发送间隔(秒)
         self.guidance_interval = 30
-        # 阶段转换后是否已发送过提示
-        self.phase_intro_sent = {
-            self.PHASE_RECON: True,      # 初始阶段默认已发送
-            self.PHASE_BASELINE: False,
-            self.PHASE_PLANNING: False,
-            self.PHASE_EXPLOIT: False
-        }
-        # 记录测试发现
-        self.discoveries = []
+        # 阶段转换后是否已发送过提示（位掩码，第phase位为1表示已发送，初始阶段默认已发送）
+        self._intro_sent = 1 << self.PHASE_RECON
+        # 记录测试发现（只保留最近的MAX_DISCOVERIES条）
+        self.discoveries = deque(maxlen=MAX_DISCOVERIES)
         # 命令计数器
         self.command_counter = 0
+        # 初始指导消息只与阶段有关，按阶段缓存
+        self._initial_guidance_cache = {}
+        # 各阶段的命令处理表: 阶段 -> 命令类型 -> 处理函数
+        self._phase_handlers = {
+            self.PHASE_RECON: {
+                "THINK": self._recon_think,
+                "TYPE": self._recon_type,
+                "GOTO": self._recon_navigate,
+                "CLICK": self._recon_navigate,
+                "SCREENSHOT": self._recon_screenshot
+            },
+            self.PHASE_BASELINE: {
+                "TYPE": self._baseline_type,
+                "CLICK": self._baseline_click
+            },
+            self.PHASE_PLANNING: {
+                "THINK": self._planning_think
+            },
+            self.PHASE_EXPLOIT: {
+                "TYPE": self._exploit_type
+            }
+        }
+        # 各阶段会改变测试状态的命令类型，其他命令跳过状态更新
+        self._triggers = {phase: frozenset(handlers) for phase, handlers in self._phase_handlers.items()}
         
     def get_phase_name(self, phase=None) -> str:
         """获取测试阶段名称"""
         if phase is None:
             phase = self.current_phase
-            
-        phase_names = {
-            self.PHASE_RECON: "信息收集",
-            self.PHASE_BASELINE: "基准建立",
-            self.PHASE_PLANNING: "漏洞评估",
-            self.PHASE_EXPLOIT: "漏洞验证"
-        }
-        return phase_names.get(phase, "未知阶段")
+        return self._PHASE_NAMES.get(phase, "未知阶段")
         
     def get_current_guidance(self) -> str:
         """获取当前阶段的指导信息"""
-        guidance = {
-            self.PHASE_RECON: "全面观察网站结构和功能，识别安全机制，记录输入点",
-            self.PHASE_BASELINE: "验证核心功能是否正常工作，使用有效输入测试正常流程",
-            self.PHASE_PLANNING: "评估每个输入点的漏洞可能性，制定详细测试计划",
-            self.PHASE_EXPLOIT: "系统化执行测试计划，验证所有可能的漏洞"
-        }
-        return guidance.get(self.current_phase, "按渗透测试流程进行")
+        return self._GUIDANCE.get(self.current_phase, "按渗透测试流程进行")
         
     def get_initial_guidance(self) -> str:
         """获取初始指导消息"""
+        guidance = self._initial_guidance_cache.get(self.current_phase)
+        if guidance is None:
+            guidance = self._initial_guidance_cache[self.current_phase] = self._build_initial_guidance()
+        return guidance
+        
+    def _build_initial_guidance(self) -> str:
+        """生成当前阶段的初始指导消息"""
         return f"""
 [系统] DeePulse测试启动，请遵循递进式测试方法：
 1. 信息收集 - 先全面了解系统
@@ -87,12 +294,14 @@ class TestFramework:
         self.command_counter += 1
         
         # 解析命令
-        cmd_parts = command.split(' ', 1)
-        cmd_type = cmd_parts[0] if cmd_parts else ""
-        cmd_content = cmd_parts[1] if len(cmd_parts) > 1 else ""
+        cmd_type, _, cmd_content = command.partition(' ')
+        
+        # 一次扫描命令内容，状态更新和事件指导共用命中的关键字类别
+        hits = _scan_command(cmd_content) if cmd_type in _KEYWORD_CMD_TYPES else set()
         
-        # 更新测试状态
-        self._update_state_from_command(cmd_type, cmd_content)
+        # 更新测试状态（当前阶段不处理的命令类型不会改变状态，直接跳过）
+        if cmd_type in self._triggers.get(self.current_phase, ()):
+            self._update_state_from_command(cmd_type, cmd_content, hits)
         
         # 检查是否需要发送阶段介绍
         phase_intro = self._check_phase_intro()
@@ -104,85 +313,88 @@ class TestFramework:
             return self._get_guidance_message()
             
         # 检查是否有特定事件触发的指导
-        event_guidance = self._check_event_guidance(cmd_type, cmd_content)
+        event_guidance = self._check_event_guidance(cmd_type, cmd_content, hits)
         if event_guidance:
             return event_guidance
             
         return None
         
-    def _update_state_from_command(self, cmd_type: str, cmd_content: str) -> None:
+    def _update_state_from_command(self, cmd_type: str, cmd_content: str, hits: set) -> None:
         """根据命令更新测试状态"""
-        # 信息收集阶段状态更新
-        if self.current_phase == self.PHASE_RECON:
-            # 识别安全机制
-            if cmd_type == "THINK" and ("验证码" in cmd_content or "captcha" in cmd_content.lower()):
-                self._add_security_mechanism("captcha", "验证码保护")
-                self.phase_progress += 10
-                
-            # 识别其他安全机制
-            if cmd_type == "THINK" and ("csrf" in cmd_content.lower() or "令牌" in cmd_content or "token" in cmd_content.lower()):
-                self._add_security_mechanism("csrf", "CSRF令牌保护")
-                self.phase_progress += 10
-                
-            # 识别输入点
-            if cmd_type == "TYPE":
-                parts = cmd_content.split(' ', 1)
-                if len(parts) > 0:
-                    self._add_input_point(parts[0], cmd_content)
-                    self.phase_progress += 5
-                    
-            # 探索网站
-            if cmd_type == "GOTO" or cmd_type == "CLICK":
-                self.phase_progress += 3
-                
-            # 信息分析
-            if cmd_type == "SCREENSHOT":
-                self.phase_progress += 2
-        
-        # 基准建立阶段状态更新
-        elif self.current_phase == self.PHASE_BASELINE:
-            # 功能验证
-            if cmd_type == "TYPE" and len(cmd_content.split(' ')) > 1:
-                self.phase_progress += 5
-                
-            # 功能确认
-            if cmd_type == "CLICK" and "登录" in cmd_content:
-                self.phase_progress += 10
-                self._add_discovery("尝试正常登录流程")
-                
-            # 验证码处理
-            if cmd_type == "TYPE" and "验证码" in cmd_content:
-                self.phase_progress += 8
-                self._add_discovery("正确处理验证码")
-                
-        # 漏洞评估阶段状态更新
-        elif self.current_phase == self.PHASE_PLANNING:
-            # 漏洞分析
-            if cmd_type == "THINK" and any(term in cmd_content.lower() for term in ["sql", "注入", "xss", "csrf", "漏洞"]):
-                self.phase_progress += 10
-                terms = ["sql注入", "xss", "csrf", "命令注入", "文件上传"]
-                for term in terms:
-                    if term in cmd_content.lower():
-                        self._add_discovery(f"计划测试{term}漏洞")
-                
-        # 漏洞验证阶段状态更新
-        elif self.current_phase == self.PHASE_EXPLOIT:
-            # SQL注入测试
-            if cmd_type == "TYPE" and any(term in cmd_content for term in ["'", "\"", "--", "UNION", "SELECT"]):
-                self.phase_progress += 5
-                self._add_discovery("执行SQL注入测试")
-                
-            # XSS测试
-            if cmd_type == "TYPE" and any(term in cmd_content for term in ["<script>", "alert", "onerror", "javascript:"]):
-                self.phase_progress += 5
-                self._add_discovery("执行XSS注入测试")
-                
+        # 按 阶段 -> 命令类型 查表找到处理函数
+        handler = self._phase_handlers.get(self.current_phase, {}).get(cmd_type)
+        if handler:
+            handler(cmd_content, hits)
+            
         # 限制进度最大值
         self.phase_progress = min(100, self.phase_progress)
         
         # 检查阶段转换
         self._check_phase_transition()
         
+    def _recon_think(self, cmd_content: str, hits: set) -> None:
+        """信息收集阶段：从思考内容中识别安全机制"""
+        # 识别验证码
+        if "captcha" in hits:
+            self._add_security_mechanism("captcha", "验证码保护")
+            self.phase_progress += 10
+            
+        # 识别其他安全机制
+        if "csrf" in hits:
+            self._add_security_mechanism("csrf", "CSRF令牌保护")
+            self.phase_progress += 10
+            
+    def _recon_type(self, cmd_content: str, hits: set) -> None:
+        """信息收集阶段：识别输入点"""
+        selector, _, _ = cmd_content.partition(' ')
+        self._add_input_point(selector, cmd_content)
+        self.phase_progress += 5
+            
+    def _recon_navigate(self, cmd_content: str, hits: set) -> None:
+        """信息收集阶段：探索网站"""
+        self.phase_progress += 3
+        
+    def _recon_screenshot(self, cmd_content: str, hits: set) -> None:
+        """信息收集阶段：信息分析"""
+        self.phase_progress += 2
+        
+    def _baseline_type(self, cmd_content: str, hits: set) -> None:
+        """基准建立阶段：功能验证和验证码处理"""
+        # 功能验证
+        if ' ' in cmd_content:
+            self.phase_progress += 5
+            
+        # 验证码处理
+        if "captcha_cn" in hits:
+            self.phase_progress += 8
+            self._add_discovery("正确处理验证码")
+            
+    def _baseline_click(self, cmd_content: str, hits: set) -> None:
+        """基准建立阶段：功能确认"""
+        if "login" in hits:
+            self.phase_progress += 10
+            self._add_discovery("尝试正常登录流程")
+            
+    def _planning_think(self, cmd_content: str, hits: set) -> None:
+        """漏洞评估阶段：漏洞分析"""
+        if "vuln" in hits:
+            self.phase_progress += 10
+            for term in _PLANNED_VULN_TERMS:
+                if ("plan", term) in hits:
+                    self._add_discovery(f"计划测试{term}漏洞")
+                    
+    def _exploit_type(self, cmd_content: str, hits: set) -> None:
+        """漏洞验证阶段：记录注入测试"""
+        # SQL注入测试
+        if "sql_payload" in hits:
+            self.phase_progress += 5
+            self._add_discovery("执行SQL注入测试")
+            
+        # XSS测试
+        if "xss_test" in hits:
+            self.phase_progress += 5
+            self._add_discovery("执行XSS注入测试")
+            
     def _check_phase_transition(self) -> None:
         """检查是否应该转换到下一个阶段"""
         # 信息收集 -> 基准建立
@@ -205,46 +417,38 @@ class TestFramework:
     def _add_security_mechanism(self, mech_type: str, description: str) -> None:
         """添加安全机制"""
         # 检查是否已存在
-        for mech in self.security_mechanisms:
-            if mech.get("type") == mech_type:
-                return
-                
-        self.security_mechanisms.append({
-            "type": mech_type,
-            "description": description,
-            "timestamp": time.time()
-        })
+        if mech_type in self.security_mechanisms:
+            return
+            
+        self.security_mechanisms[mech_type] = SecurityMechanism(mech_type, description, time.monotonic())
+        self._update_recon_count_msg()
         
     def _add_input_point(self, selector: str, context: str) -> None:
         """添加输入点"""
         # 检查是否已存在
-        for point in self.input_points:
-            if point.get("selector") == selector:
-                return
-                
-        self.input_points.append({
-            "selector": selector,
-            "context": context,
-            "timestamp": time.time()
-        })
+        if selector in self.input_points:
+            return
+            
+        self.input_points[selector] = InputPoint(selector, context, time.monotonic())
+        self._update_recon_count_msg()
+        
+    def _update_recon_count_msg(self) -> None:
+        """更新信息收集阶段的统计指导消息"""
+        self._recon_count_msg = f"[系统提示] 已发现{len(self.security_mechanisms)}个安全机制和{len(self.input_points)}个输入点"
         
     def _add_discovery(self, description: str) -> None:
         """添加测试发现"""
-        self.discoveries.append({
-            "description": description,
-            "phase": self.current_phase,
-            "timestamp": time.time()
-        })
+        self.discoveries.append(Discovery(description, self.current_phase, time.monotonic()))
         
     def _should_send_guidance(self) -> bool:
         """检查是否应该发送周期性指导"""
-        current_time = time.time()
-        # 至少经过一定时间间隔
-        if current_time - self.last_guidance_time < self.guidance_interval:
+        # 根据命令数量控制频率（每10条命令可能触发一次），先做廉价的计数检查再读时钟
+        if self.command_counter % 10 != 0:
             return False
             
-        # 根据命令数量控制频率（每10条命令可能触发一次）
-        if self.command_counter % 10 != 0:
+        # 至少经过一定时间间隔
+        current_time = time.monotonic()
+        if current_time - self.last_guidance_time < self.guidance_interval:
             return False
             
         self.last_guidance_time = current_time
@@ -252,121 +456,46 @@ class TestFramework:
         
     def _get_guidance_message(self) -> str:
         """获取周期性指导消息"""
-        # 根据当前阶段和进度选择合适的指导消息
-        guidance_by_phase = {
-            self.PHASE_RECON: [
-                "继续探索网站结构，确保不遗漏任何功能点",
-                "特别注意隐藏的安全机制，如请求头中的令牌",
-                f"已发现{len(self.security_mechanisms)}个安全机制和{len(self.input_points)}个输入点",
-                "记住SCAN方法：勘察环境、关联信息、分析路径、决定行动"
-            ],
-            
-            self.PHASE_BASELINE: [
-                "确保验证所有主要功能，而不仅仅是登录功能",
-                "记录系统如何处理边界情况和无效输入",
-                "注意验证码刷新机制和错误处理方式",
-                "记住SCAN方法：勘察环境、关联信息、分析路径、决定行动"
-            ],
-            
-            self.PHASE_PLANNING: [
-                "考虑不同类型的漏洞测试向量",
-                "注意安全机制之间的相互作用",
-                "记住规划测试顺序，从低风险测试开始",
-                "记住SCAN方法：勘察环境、关联信息、分析路径、决定行动"
-            ],
-            
-            self.PHASE_EXPLOIT: [
-                "保持对验证码等安全机制的正确处理",
-                "系统化验证每个潜在漏洞",
-                "记录每个测试的详细结果",
-                "记住SCAN方法：勘察环境、关联信息、分析路径、决定行动"
-            ]
-        }
+        # 根据进度选择指导消息：<30、<70、其余分别对应0、1、2
+        bucket = (self.phase_progress >= 30) + (self.phase_progress >= 70)
+        message = self._GUIDANCE_MESSAGES.get(self.current_phase, self._DEFAULT_GUIDANCE_MESSAGES)[bucket]
         
-        # 根据当前阶段选择消息组
-        guidance_list = guidance_by_phase.get(self.current_phase, ["继续系统化测试"])
-        
-        # 根据进度选择指导消息
-        if self.phase_progress < 30:
-            index = 0
-        elif self.phase_progress < 70:
-            index = 1
-        else:
-            index = 2
-            
-        # 如果索引超出范围，使用最后一条消息
-        if index >= len(guidance_list):
-            index = len(guidance_list) - 1
-            
-        return f"[系统提示] {guidance_list[index]}"
+        # 信息收集阶段的最后一条消息包含实时统计，由_add_*方法维护
+        if message is None:
+            return self._recon_count_msg
+        return message
         
     def _check_phase_intro(self) -> Optional[str]:
         """检查是否需要发送阶段介绍"""
-        if not self.phase_intro_sent.get(self.current_phase, True):
-            # 更新状态，避免重复发送
-            self.phase_intro_sent[self.current_phase] = True
-            
-            # 准备阶段介绍
-            phase_intros = {
-                self.PHASE_BASELINE: f"""
-[系统] 进入{self.get_phase_name()}阶段
-
-在这个阶段，您需要：
-1. 使用有效输入验证基本功能
-2. 特别注意验证码等安全机制的正确处理
-3. 记录正常响应和错误响应的特征
-
-请确保基本功能正常工作，再考虑漏洞测试。
-""",
-                self.PHASE_PLANNING: f"""
-[系统] 进入{self.get_phase_name()}阶段
-
-在这个阶段，您需要：
-1. 分析每个输入点可能存在的漏洞
-2. 评估安全机制的有效性
-3. 按威胁程度排序可能的漏洞
-4. 制定详细的测试计划
-
-请系统思考每个可能的漏洞点，而不是随机测试。
-""",
-                self.PHASE_EXPLOIT: f"""
-[系统] 进入{self.get_phase_name()}阶段
-
-在这个阶段，您需要：
-1. 系统执行测试计划
-2. 对每个输入点尝试适当的测试向量
-3. 同时正确处理验证码等安全机制
-4. 收集每个漏洞的证据
-
-请记住，漏洞测试需要在保持系统稳定的前提下进行。
-"""
-            }
+        phase = self.current_phase
+        if (self._intro_sent >> phase) & 1:
+            return None
             
-            return phase_intros.get(self.current_phase)
-        
-        return None
+        # 更新状态，避免重复发送
+        self._intro_sent |= 1 << phase
+        return self._PHASE_INTROS.get(phase)
         
-    def _check_event_guidance(self, cmd_type: str, cmd_content: str) -> Optional[str]:
+    def _check_event_guidance(self, cmd_type: str, cmd_content: str, hits: set) -> Optional[str]:
         """检查是否有特定事件触发的指导"""
         # 验证码相关事件
         if self.current_phase >= self.PHASE_BASELINE:
-            if cmd_type == "TYPE" and any(term in cmd_content.lower() for term in ["验证码", "captcha"]):
+            if cmd_type == "TYPE" and "captcha" in hits:
                 return "[系统反馈] 正确处理验证码，这是漏洞测试中的重要一步"
                 
-            if cmd_type == "THINK" and "验证码错误" in cmd_content:
+            if cmd_type == "THINK" and "captcha_error" in hits:
                 return "[系统反馈] 验证码处理失败，尝试刷新获取新验证码"
                 
         # SQL注入测试事件
         if self.current_phase == self.PHASE_EXPLOIT:
-            if cmd_type == "TYPE" and any(term in cmd_content for term in ["'", "\"", "--", "UNION", "SELECT"]):
+            if cmd_type == "TYPE" and "sql_payload" in hits:
                 return "[系统反馈] 正在测试SQL注入，请确保同时正确处理其他安全机制"
                 
-            if cmd_type == "TYPE" and any(term in cmd_content for term in ["<script>", "alert", "onerror"]):
+            if cmd_type == "TYPE" and "xss_payload" in hits:
                 return "[系统反馈] 正在测试XSS漏洞，记得测试不同的XSS向量"
                 
         # 思考方法指导
         if cmd_type == "THINK" and len(cmd_content) > 50:
-            if "验证码" in cmd_content and "正确" not in cmd_content:
+            if "captcha_cn" in hits and "correct" not in hits:
                 return "[系统反馈] 考虑在测试漏洞前先处理好验证码等安全机制"
                 
         return None 
\ No newline at end of file
@@ -4,18 +4,31 @@ Web漏洞测试模块集合
 包含用于检测各种Web安全漏洞的测试类
 """
 
-__version__ = '0.1.0'
+import importlib
+from functools import lru_cache
 
-# 导入各种测试模块
-from .sql_injection import SQLInjectionTester
-from .xss import XSSTester
-from .command_injection import CommandInjectionTester
-from .path_traversal import PathTraversalTester
+__version__ = '0.1.0'
 
-# 映射表，将漏洞类型字符串映射到对应的测试类
+# 映射表，将漏洞类型字符串映射到对应测试类所在的模块和类名
+# 测试模块在首次使用时才导入，只测试一种漏洞时不必加载其他模块
 TESTER_MAP = {
-    "sql_injection": SQLInjectionTester,
-    "xss": XSSTester,
-    "command_injection": CommandInjectionTester,
-    "path_traversal": PathTraversalTester
-} 
\ No newline at end of file
+    "sql_injection": (".sql_injection", "SQLInjectionTester"),
+    "xss": (".xss", "XSSTester"),
+    "command_injection": (".command_injection", "CommandInjectionTester"),
+    "path_traversal": (".path_traversal", "PathTraversalTester")
+}
+
+# 测试类名 -> 漏洞类型
+_TESTER_TYPES = {class_name: vulnerability_type for vulnerability_type, (_, class_name) in TESTER_MAP.items()}
+
+@lru_cache(maxsize=None)
+def get_tester(vulnerability_type: str) -> type:
+    """按漏洞类型获取测试类，首次调用时导入对应的测试模块"""
+    module_name, class_name = TESTER_MAP[vulnerability_type]
+    return getattr(importlib.import_module(module_name, __name__), class_name)
+
+def __getattr__(name: str):
+    """按需导入测试类，兼容 from modules.testers import SQLInjectionTester 的写法"""
+    if name in _TESTER_TYPES:
+        return get_tester(_TESTER_TYPES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
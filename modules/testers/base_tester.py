@@ -1,10 +1,57 @@
+import copy
 from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Optional
+from urllib.parse import urlsplit
 from playwright.async_api import Page
 
+# 页面DOM的廉价指纹（元素总数和表单数），页面内容变化后缓存的解析结果失效
+_DOM_FINGERPRINT_JS = "() => document.getElementsByTagName('*').length + '|' + document.forms.length"
+
+# 最多保留的info测试结果详情数（摘要只返回前5个），避免长时间测试时无限增长；
+# warning、error、success等其他状态的记录始终保留
+MAX_TEST_DETAILS = 50
+
+# 读取body中的文本，跳过script、style和noscript元素中的源码（与innerText一样只包含页面内容，
+# 但不触发布局计算）；limit不为null时只返回前limit个字符
+_PAGE_TEXT_JS = """
+(limit) => {
+    if (!document.body) return '';
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT, {
+        acceptNode: node => node.parentElement.closest('script, style, noscript')
+            ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT
+    });
+    let text = '';
+    while ((limit == null || text.length < limit) && walker.nextNode()) {
+        text += walker.currentNode.nodeValue;
+    }
+    return limit == null ? text : text.slice(0, limit);
+}
+"""
+
+# 读取一组元素的原始属性值（type、name、id）
+_ELEMENT_ATTRS_JS = "el => ({type: el.getAttribute('type') || 'text', name: el.getAttribute('name') || '', id: el.getAttribute('id') || ''})"
+
+# 序列化所有表单，包括表单内的输入元素和提交按钮ID（没有提交按钮时为null）
+_SERIALIZE_FORMS_JS = f"""
+    forms => forms.map(form => {{
+        const submit = form.querySelector('input[type="submit"], button[type="submit"]');
+        return {{
+            id: form.getAttribute('id') || '',
+            action: form.getAttribute('action') || '',
+            method: form.getAttribute('method') || 'GET',
+            inputs: Array.from(form.querySelectorAll('input, textarea, select')).map({_ELEMENT_ATTRS_JS}),
+            submitId: submit ? (submit.getAttribute('id') || '') : null
+        }};
+    }})
+"""
+
 class BaseTester(ABC):
     """漏洞测试基类"""
     
+    # 基类公共状态使用__slots__，子类各自的状态仍保存在实例__dict__中
+    __slots__ = ("agent", "name", "description", "found_vulnerabilities", "test_results", "_vulnerability_keys", "_site_analyzer",
+                 "_info_detail_count", "_truncated_marker")
+    
     def __init__(self, agent):
         self.agent = agent
         self.name = "base_tester"
@@ -15,6 +62,13 @@ class BaseTester(ABC):
             "details": [],
             "vulnerable_points": []
         }
+        # 已记录漏洞的 (漏洞类型, URL的协议、主机和路径, 输入点选择器或URL参数名)，同一位置的同类漏洞只记录一次
+        self._vulnerability_keys = set()
+        # agent上的站点分析器只解析一次（没有时为None）
+        self._site_analyzer = getattr(agent, 'site_analyzer', None) or None
+        # 已保留的info记录数，以及超出上限后记录省略条数的详情（未省略时为None）
+        self._info_detail_count = 0
+        self._truncated_marker = None
     
     @abstractmethod
     async def test(self, target: Dict[str, Any]) -> Dict[str, Any]:
@@ -26,27 +80,74 @@ class BaseTester(ABC):
         """验证特定输入点是否存在漏洞"""
         pass
     
+    def _get_page_cache(self, page: Page) -> Dict[Any, Any]:
+        """
+        获取挂在agent上的页面解析结果缓存，多个测试模块扫描同一页面时共享
+        
+        页面主框架发生导航时清空缓存
+        """
+        cache = getattr(self.agent, '_page_parse_cache', None)
+        if cache is None:
+            cache = {}
+            self.agent._page_parse_cache = cache
+            self.agent._page_parse_cache_pages = set()
+        
+        # 每个页面只注册一次导航监听
+        if id(page) not in self.agent._page_parse_cache_pages:
+            self.agent._page_parse_cache_pages.add(id(page))
+            page.on("framenavigated", lambda frame: cache.clear() if frame == page.main_frame else None)
+        
+        return cache
+    
+    async def _collect_cached(self, page: Page, kind: str, basic_detection) -> List[Dict[str, Any]]:
+        """
+        按 (类型, 页面URL) 缓存收集结果，DOM指纹不变时直接复用
+        
+        有站点分析器时，一次analyze_site同时缓存输入点和表单；否则使用基本检测方法
+        
+        Args:
+            page: 页面对象
+            kind: 结果类型（input_points或forms）
+            basic_detection: 没有站点分析器时执行的检测协程函数
+            
+        Returns:
+            收集结果的副本（测试模块会修改返回的字典，不能共享缓存中的对象）
+        """
+        cache = self._get_page_cache(page)
+        key = (kind, page.url)
+        fingerprint = await page.evaluate(_DOM_FINGERPRINT_JS)
+        
+        cached = cache.get(key)
+        if cached is None or cached[0] != fingerprint:
+            if self._site_analyzer is not None:
+                await self._site_analyzer.analyze_site(page)
+                cache[("input_points", page.url)] = (fingerprint, self._site_analyzer.get_input_points())
+                cache[("forms", page.url)] = (fingerprint, self._site_analyzer.get_forms())
+                cached = cache[key]
+            else:
+                cached = (fingerprint, await basic_detection(page))
+                cache[key] = cached
+        
+        return copy.deepcopy(cached[1])
+    
     async def collect_input_points(self, page: Page) -> List[Dict[str, Any]]:
         """收集可能的输入点"""
-        # 如果有站点分析器，使用它收集输入点
-        if hasattr(self.agent, 'site_analyzer') and self.agent.site_analyzer:
-            await self.agent.site_analyzer.analyze_site(page)
-            return self.agent.site_analyzer.get_input_points()
-        
-        # 否则使用基本方法识别输入点
-        return await self._basic_input_detection(page)
+        return await self._collect_cached(page, "input_points", self._basic_input_detection)
     
     async def _basic_input_detection(self, page: Page) -> List[Dict[str, Any]]:
         """基本的输入点检测方法"""
         inputs = []
         
-        # 检测输入框
-        input_elements = await page.query_selector_all('input:not([type="hidden"]):not([type="submit"])')
+        # 检测输入框（一次浏览器往返取回所有输入框的属性，避免逐个元素调用get_attribute）
+        input_elements = await page.eval_on_selector_all(
+            'input:not([type="hidden"]):not([type="submit"])',
+            f"els => els.map({_ELEMENT_ATTRS_JS})"
+        )
         
-        for i, input_el in enumerate(input_elements):
-            input_type = await input_el.get_attribute('type') or 'text'
-            input_name = await input_el.get_attribute('name') or ''
-            input_id = await input_el.get_attribute('id') or ''
+        for i, input_data in enumerate(input_elements):
+            input_type = input_data["type"]
+            input_name = input_data["name"]
+            input_id = input_data["id"]
             
             # 创建选择器
             selector = f"#{input_id}" if input_id else f"[name='{input_name}']" if input_name else f"input:nth-of-type({i+1})"
@@ -61,11 +162,11 @@ class BaseTester(ABC):
             })
         
         # 检测文本区域
-        textarea_elements = await page.query_selector_all('textarea')
+        textarea_elements = await page.eval_on_selector_all('textarea', f"els => els.map({_ELEMENT_ATTRS_JS})")
         
-        for i, textarea_el in enumerate(textarea_elements):
-            textarea_name = await textarea_el.get_attribute('name') or ''
-            textarea_id = await textarea_el.get_attribute('id') or ''
+        for i, textarea_data in enumerate(textarea_elements):
+            textarea_name = textarea_data["name"]
+            textarea_id = textarea_data["id"]
             
             # 创建选择器
             selector = f"#{textarea_id}" if textarea_id else f"[name='{textarea_name}']" if textarea_name else f"textarea:nth-of-type({i+1})"
@@ -83,36 +184,29 @@ class BaseTester(ABC):
     
     async def collect_forms(self, page: Page) -> List[Dict[str, Any]]:
         """收集表单"""
-        # 如果有站点分析器，使用它收集表单
-        if hasattr(self.agent, 'site_analyzer') and self.agent.site_analyzer:
-            await self.agent.site_analyzer.analyze_site(page)
-            return self.agent.site_analyzer.get_forms()
-        
-        # 否则使用基本方法识别表单
-        return await self._basic_form_detection(page)
+        return await self._collect_cached(page, "forms", self._basic_form_detection)
     
     async def _basic_form_detection(self, page: Page) -> List[Dict[str, Any]]:
         """基本的表单检测方法"""
         forms = []
         
-        form_elements = await page.query_selector_all('form')
+        # 一次浏览器往返取回所有表单、输入元素和提交按钮的属性
+        form_elements = await page.eval_on_selector_all('form', _SERIALIZE_FORMS_JS)
         
-        for i, form_el in enumerate(form_elements):
-            form_id = await form_el.get_attribute('id') or ''
-            form_action = await form_el.get_attribute('action') or ''
-            form_method = await form_el.get_attribute('method') or 'GET'
+        for i, form_data in enumerate(form_elements):
+            form_id = form_data["id"]
+            form_action = form_data["action"]
+            form_method = form_data["method"]
             
             # 创建表单选择器
             form_selector = f"form#{form_id}" if form_id else f"form:nth-of-type({i+1})"
             
-            # 获取表单中的输入元素
-            input_elements = await form_el.query_selector_all('input, textarea, select')
-            
+            # 表单中的输入元素
             inputs = []
-            for j, input_el in enumerate(input_elements):
-                input_type = await input_el.get_attribute('type') or 'text'
-                input_name = await input_el.get_attribute('name') or ''
-                input_id = await input_el.get_attribute('id') or ''
+            for j, input_data in enumerate(form_data["inputs"]):
+                input_type = input_data["type"]
+                input_name = input_data["name"]
+                input_id = input_data["id"]
                 
                 # 创建输入选择器
                 input_selector = f"#{input_id}" if input_id else f"[name='{input_name}']" if input_name else f"{form_selector} input:nth-of-type({j+1})"
@@ -125,10 +219,9 @@ class BaseTester(ABC):
                 })
             
             # 查找提交按钮
-            submit_button = await form_el.query_selector('input[type="submit"], button[type="submit"]')
+            submit_id = form_data["submitId"]
             submit_selector = ""
-            if submit_button:
-                submit_id = await submit_button.get_attribute('id') or ''
+            if submit_id is not None:
                 submit_selector = f"#{submit_id}" if submit_id else f"{form_selector} input[type='submit'], {form_selector} button[type='submit']"
             
             forms.append({
@@ -144,23 +237,50 @@ class BaseTester(ABC):
         
         return forms
     
-    async def get_page_text(self, page: Page) -> str:
-        """获取页面文本内容"""
-        return await page.evaluate("""
-            () => {
-                return document.body.innerText;
-            }
-        """)
+    async def get_page_text(self, page: Page, rendered: bool = False, limit: Optional[int] = None) -> str:
+        """
+        获取页面文本内容
+        
+        Args:
+            page: 页面对象
+            rendered: 是否按渲染结果获取文本（innerText，会触发页面布局计算），
+                默认直接读取文本节点，跳过内联脚本和样式的源码，避免页面自身的JS触发漏洞特征
+            limit: 只返回前limit个字符（只对默认方式有效），None表示不限制
+        """
+        if rendered:
+            return await page.inner_text("body")
+        return await page.evaluate(_PAGE_TEXT_JS, limit)
     
     def record_vulnerability(self, details: Dict[str, Any]) -> None:
-        """记录发现的漏洞"""
+        """记录发现的漏洞，同一URL（不含查询参数）上同一位置的同类漏洞只记录一次"""
+        input_point = details.get("input_point")
+        target = input_point.get("selector") if input_point else details.get("param_name")
+        url = urlsplit(details.get("url") or "")
+        key = (details.get("vulnerability"), url.scheme, url.netloc, url.path, target)
+        if key in self._vulnerability_keys:
+            return
+        self._vulnerability_keys.add(key)
+        
         self.found_vulnerabilities.append(details)
         self.test_results["vulnerable_points"].append(details)
         self.test_results["status"] = "vulnerable"
         
     def record_test_result(self, details: Dict[str, Any]) -> None:
-        """记录测试结果"""
-        self.test_results["details"].append(details)
+        """记录测试结果，info记录超过MAX_TEST_DETAILS条后只记录省略的条数"""
+        if details.get("status") != "info":
+            self.test_results["details"].append(details)
+            return
+        
+        if self._info_detail_count < MAX_TEST_DETAILS:
+            self._info_detail_count += 1
+            self.test_results["details"].append(details)
+            return
+        
+        if self._truncated_marker is None:
+            self._truncated_marker = {"step": "truncated", "status": "info", "truncated": 0}
+            self.test_results["details"].append(self._truncated_marker)
+        self._truncated_marker["truncated"] += 1
+        self._truncated_marker["message"] = f"已省略{self._truncated_marker['truncated']}条信息记录"
     
     def get_test_results(self) -> Dict[str, Any]:
         """获取测试结果摘要"""
@@ -1,10 +1,218 @@
-from typing import Dict, List, Any, Optional
-from playwright.async_api import Page
+from collections import Counter
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+from playwright.async_api import ElementHandle, Page, Request, TimeoutError as PlaywrightTimeoutError
 import asyncio
+import json
+import os
 import re
+import sys
+import time
 
 from .base_tester import BaseTester
 
+# 可选：安装pyahocorasick时用Aho-Corasick自动机一次扫描页面内容中的所有特征字符串
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# 可选：安装hyperscan时把特征字符串和错误提示编译为一个数据库，一次扫描同时完成两项检测
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# 同时测试的输入点数上限（即浏览器上下文池的大小），避免对目标站点造成过大压力
+MAX_CONCURRENT_INPUT_TESTS = 4
+
+# 同时计时的延时载荷数上限，并发测试的所有输入点共用
+MAX_CONCURRENT_BLIND_TESTS = 4
+
+# 提交载荷后等待浏览器发出请求的超时时间（毫秒），超时说明提交没有产生请求
+SUBMIT_REQUEST_TIMEOUT_MS = 1000
+
+# 请求发出后等待服务器响应的超时时间（毫秒）
+SUBMIT_RESPONSE_TIMEOUT_MS = 3000
+
+# AJAX提交收到响应后，留给页面脚本更新DOM的时间（秒）
+RESPONSE_SETTLE_DELAY = 0.1
+
+# 提交表单可能产生的请求类型
+_SUBMIT_RESOURCE_TYPES = frozenset(["document", "xhr", "fetch"])
+
+def _is_submit_request(request: Request) -> bool:
+    """判断请求是否可能来自表单提交（页面导航或AJAX请求）"""
+    return request.resource_type in _SUBMIT_RESOURCE_TYPES
+
+class SubmitResult(NamedTuple):
+    """提交载荷的结果"""
+    navigated: bool  # 提交后主框架是否发生了导航
+    response_time: Optional[float]  # 从提交到收到响应的秒数，没有产生请求或未收到响应时为None
+
+# 读取页面文本的长度上限，命令输出的特征字符串很短，只需检查页面开头部分
+MAX_PAGE_TEXT_LENGTH = 65536
+
+# 用HEAD请求读取当前页面的响应头（名称统一为小写）
+_RESPONSE_HEADERS_JS = """
+async () => {
+    try {
+        const resp = await fetch(window.location.href, {method: 'HEAD'});
+        const headers = {};
+        resp.headers.forEach((value, name) => {
+            headers[name.toLowerCase()] = value;
+        });
+        return headers;
+    } catch (e) {
+        return {};
+    }
+}
+"""
+
+# Server、X-Powered-By头中表明目标运行在Windows上的标识
+_WINDOWS_SERVER_MARKERS = ("microsoft-iis", "win32", "win64", "windows")
+
+# 只有Windows上的ASP.NET（IIS）才会返回的响应头
+_WINDOWS_ONLY_HEADERS = ("x-aspnet-version", "x-aspnetmvc-version")
+
+# 清空当前源的localStorage并写回快照中的条目
+_RESTORE_LOCAL_STORAGE_JS = """
+(items) => {
+    localStorage.clear();
+    for (const item of items) {
+        localStorage.setItem(item.name, item.value);
+    }
+}
+"""
+
+# 载荷命中统计文件，按主机名记录各载荷发现漏洞的次数，重复扫描时优先尝试命中过的载荷
+# 默认保存在用户目录下，可通过环境变量DEEPULSE_PAYLOAD_STATS_FILE指定其他路径
+PAYLOAD_STATS_FILE = os.path.expanduser(
+    os.getenv("DEEPULSE_PAYLOAD_STATS_FILE", "~/.deepulse/command_injection_stats.json")
+)
+
+# 进程内共享的载荷命中统计，首次创建测试器时读取一次
+_payload_wins: Optional[Counter] = None
+
+# 命令执行错误提示的特征
+_ERROR_PATTERNS = (
+    r"command not found",
+    r"syntax error",
+    r"unexpected token",
+    r"unrecognized command",
+    r"is not recognized as",
+    r"<b>Warning</b>",
+    r"<b>Error</b>",
+    r"Fatal error",
+    r"system error",
+    r"sh:",
+    r"bash:",
+    r"cmd:",
+    r"Exception",
+    r"not found in PATH",
+    r"\d+: No such file or directory"
+)
+
+# 所有错误特征合并为一个预编译的正则，一次扫描页面内容
+_ERROR_RE = re.compile("|".join(f"(?:{pattern})" for pattern in _ERROR_PATTERNS), re.IGNORECASE)
+
+# 注入测试只读取页面文本，不需要加载的资源类型
+_BLOCKED_RESOURCE_TYPES = frozenset(["image", "media", "font", "stylesheet"])
+
+async def _block_static_resources(route) -> None:
+    """中止图片、媒体、字体和样式表请求，其他请求照常发送"""
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+def _cookie_keys(state: Dict[str, Any]) -> set:
+    """把存储状态中的Cookie转换为可比较的集合"""
+    return {
+        (cookie.get("name"), cookie.get("value"), cookie.get("domain"), cookie.get("path"))
+        for cookie in state.get("cookies", [])
+    }
+
+def _origin_local_storage(state: Dict[str, Any], url: str) -> List[Dict[str, str]]:
+    """取出存储状态中url所在源的localStorage条目"""
+    parsed_url = urlparse(url)
+    origin = f"{parsed_url.scheme}://{parsed_url.netloc}"
+    return next(
+        (entry.get("localStorage", []) for entry in state.get("origins", []) if entry.get("origin") == origin),
+        []
+    )
+
+def _load_payload_wins() -> Counter:
+    """读取载荷命中统计，文件不存在或损坏时返回空统计"""
+    try:
+        with open(PAYLOAD_STATS_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return Counter({
+            (host, payload): int(count)
+            for host, payload_counts in data.items()
+            for payload, count in payload_counts.items()
+        })
+    except (OSError, ValueError, TypeError, AttributeError):
+        return Counter()
+
+def _get_payload_wins() -> Counter:
+    """获取进程内共享的载荷命中统计，只在第一次调用时读取文件"""
+    global _payload_wins
+    if _payload_wins is None:
+        _payload_wins = _load_payload_wins()
+    return _payload_wins
+
+def _save_payload_wins(payload_wins: Counter) -> None:
+    """按 {主机名: {载荷: 命中次数}} 的结构保存载荷命中统计"""
+    data = {}
+    for (host, payload), count in payload_wins.items():
+        data.setdefault(host, {})[payload] = count
+    try:
+        os.makedirs(os.path.dirname(PAYLOAD_STATS_FILE) or ".", exist_ok=True)
+        with open(PAYLOAD_STATS_FILE, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"保存载荷命中统计失败: {str(e)}")
+
+def _intern_unique(strings: List[str]) -> Tuple[str, ...]:
+    """去除重复字符串（保持原有顺序）并驻留，返回不可变元组"""
+    return tuple(sys.intern(string) for string in dict.fromkeys(strings))
+
+def _build_hyperscan_database(detection_strings: Dict[str, Tuple[str, ...]]):
+    """
+    把各操作系统的特征字符串（区分大小写）和错误提示正则（不区分大小写）编译为一个Hyperscan数据库
+    
+    Returns:
+        (数据库, 按模式ID排列的分组名)，分组名为操作系统类型或"error"
+    """
+    expressions = []
+    flags = []
+    groups = []
+    for os_type, strings in detection_strings.items():
+        for string in strings:
+            expressions.append(re.escape(string).encode("utf-8"))
+            flags.append(hyperscan.HS_FLAG_SINGLEMATCH)
+            groups.append(os_type)
+    for pattern in _ERROR_PATTERNS:
+        expressions.append(pattern.encode("utf-8"))
+        flags.append(hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH)
+        groups.append("error")
+    
+    database = hyperscan.Database()
+    database.compile(expressions=expressions, ids=list(range(len(expressions))),
+                     elements=len(expressions), flags=flags)
+    return database, tuple(groups)
+
+def _build_automaton(keywords: List[str]):
+    """用特征字符串构建Aho-Corasick自动机（区分大小写）"""
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
 class CommandInjectionTester(BaseTester):
     """命令注入漏洞测试模块"""
     
@@ -39,15 +247,6 @@ class CommandInjectionTester(BaseTester):
                 "&& sleep 5 &&",
                 "|| sleep 5"
             ],
-            "special_chars": [
-                "|",
-                ";",
-                "&",
-                "$(",
-                "`",
-                "||",
-                "&&"
-            ],
             "windows": [
                 "dir",
                 "type %WINDIR%\\win.ini",
@@ -81,7 +280,42 @@ class CommandInjectionTester(BaseTester):
                 "WINDOWS"
             ]
         }
+        self.detection_strings = {os_type: _intern_unique(strings) for os_type, strings in self.detection_strings.items()}
+        # 特征字符串和错误提示的扫描器只构建一次：优先使用Hyperscan数据库，其次使用各操作系统的自动机
+        self._hyperscan_database = None
+        self._hyperscan_groups = ()
+        self._detection_automata = None
+        if HYPERSCAN_AVAILABLE:
+            self._hyperscan_database, self._hyperscan_groups = _build_hyperscan_database(self.detection_strings)
+        elif AHOCORASICK_AVAILABLE:
+            self._detection_automata = {
+                os_type: _build_automaton(strings) for os_type, strings in self.detection_strings.items()
+            }
+        # 两者都未安装时按UTF-8字节查找特征字符串
+        self._detection_bytes = {
+            os_type: tuple(string.encode("utf-8") for string in strings)
+            for os_type, strings in self.detection_strings.items()
+        }
+        # 最近一次Hyperscan扫描的 (页面内容, 命中的分组)，同一内容做两项检测时只扫描一次
+        self._last_signature_scan = (None, frozenset())
         self.time_based_threshold = 4.5  # 秒，判断时间延迟的阈值
+        # (主机名, 载荷) -> 命中次数
+        self._payload_wins = _get_payload_wins()
+        # 所有输入点共用的延时载荷计时信号量，每次测试时在当前事件循环中创建
+        self._blind_semaphore: Optional[asyncio.Semaphore] = None
+        
+        # 各操作系统的测试载荷只构建一次，Windows替换基本命令和连接命令
+        unix_payloads = {
+            category: _intern_unique(self.payloads[category]) for category in ("basic", "concatenated", "blind")
+        }
+        self._payloads_by_os = {
+            "unix": unix_payloads,
+            "windows": dict(
+                unix_payloads,
+                basic=_intern_unique(self.payloads["windows"][:5]),
+                concatenated=_intern_unique(self.payloads["windows"][5:])
+            )
+        }
         
     async def test(self, target: Dict[str, Any]) -> Dict[str, Any]:
         """执行命令注入测试"""
@@ -104,6 +338,17 @@ class CommandInjectionTester(BaseTester):
             "message": f"开始命令注入测试，目标URL: {page.url}"
         })
         
+        # 测试过程中只读取页面文本，屏蔽图片、媒体、字体和样式表请求
+        await page.context.route("**/*", _block_static_resources)
+        try:
+            return await self._test_page(page)
+        finally:
+            await page.context.unroute("**/*", _block_static_resources)
+    
+    async def _test_page(self, page: Page) -> Dict[str, Any]:
+        """收集输入点并进行命令注入测试"""
+        self._blind_semaphore = asyncio.Semaphore(MAX_CONCURRENT_BLIND_TESTS)
+        
         # 收集输入点
         input_points = await self.collect_input_points(page)
         
@@ -131,27 +376,35 @@ class CommandInjectionTester(BaseTester):
             "message": f"目标系统疑似: {os_type}"
         })
         
-        # 选择合适的测试载荷
-        test_payloads = self._select_payloads(os_type)
+        # 选择合适的测试载荷，该主机上命中过的载荷排在前面
+        page_url = page.url
+        host = urlparse(page_url).hostname or ""
+        test_payloads = self._select_payloads(os_type, host)
+        
+        # 跳过不适合命令注入的输入类型
+        targets = [
+            (idx, input_point) for idx, input_point in enumerate(input_points)
+            if input_point["type"] not in ["checkbox", "radio", "file", "button", "image", "submit", "hidden"]
+        ]
+        
+        # 原始页面内容只获取一次，各输入点的检测都与它比较
+        original_content = await self._fast_page_text(page)
+        
+        # 并发测试各输入点，结果与targets顺序一致
+        results = await self._test_input_points(page, targets, test_payloads, os_type, original_content)
         
-        # 测试每个输入点
         vulnerable_inputs = []
         
-        for idx, input_point in enumerate(input_points):
-            # 跳过不适合命令注入的输入类型
-            if input_point["type"] in ["checkbox", "radio", "file", "button", "image", "submit", "hidden"]:
-                continue
-                
-            # 进行命令注入测试
-            is_vulnerable, payload = await self._test_input_point(page, input_point, idx, test_payloads, os_type)
-            
+        for (idx, input_point), (is_vulnerable, payload) in zip(targets, results):
             if is_vulnerable:
                 vulnerable_inputs.append(input_point)
+                self._payload_wins[(host, payload)] += 1
                 
                 # 记录漏洞
                 self.record_vulnerability({
                     "input_point": input_point,
                     "vulnerability": "command_injection",
+                    "url": page_url,
                     "payload": payload,
                     "os_type": os_type,
                     "details": f"该输入点存在命令注入漏洞"
@@ -159,6 +412,7 @@ class CommandInjectionTester(BaseTester):
         
         # 更新测试状态
         if vulnerable_inputs:
+            _save_payload_wins(self._payload_wins)
             self.test_results["status"] = "vulnerable"
             self.record_test_result({
                 "step": "summary",
@@ -176,28 +430,101 @@ class CommandInjectionTester(BaseTester):
         return self.get_test_results()
     
     async def _detect_os_type(self, page: Page) -> str:
-        """尝试检测目标系统的操作系统类型"""
+        """根据服务器响应头推测目标系统的操作系统类型，用于选择对应系统的测试载荷"""
+        try:
+            headers = await page.evaluate(_RESPONSE_HEADERS_JS)
+        except Exception:
+            headers = {}
+        if not isinstance(headers, dict):
+            headers = {}
+        
+        server_info = f"{headers.get('server', '')} {headers.get('x-powered-by', '')}".lower()
+        if any(marker in server_info for marker in _WINDOWS_SERVER_MARKERS):
+            return "windows"
+        if any(header in headers for header in _WINDOWS_ONLY_HEADERS):
+            return "windows"
+        
         # 默认假设为Unix系统
         return "unix"
     
-    def _select_payloads(self, os_type: str) -> Dict[str, List[str]]:
-        """根据操作系统类型选择适当的测试载荷"""
-        result = {
-            "basic": self.payloads["basic"],
-            "concatenated": self.payloads["concatenated"],
-            "blind": self.payloads["blind"],
-            "special_chars": self.payloads["special_chars"]
+    def _select_payloads(self, os_type: str, host: str = "") -> Dict[str, List[str]]:
+        """根据操作系统类型选择适当的测试载荷，并按该主机上的历史命中次数排序"""
+        payloads_by_category = self._payloads_by_os["windows" if os_type == "windows" else "unix"]
+        
+        # 稳定排序：命中过的载荷提前，其余载荷保持原有顺序
+        return {
+            category: sorted(payloads, key=lambda payload: -self._payload_wins[(host, payload)])
+            for category, payloads in payloads_by_category.items()
         }
+    
+    async def _test_input_points(self, page: Page, targets: List[Tuple[int, Dict[str, Any]]],
+                                 test_payloads: Dict[str, List[str]], os_type: str,
+                                 original_content: str) -> List[Tuple[bool, str]]:
+        """
+        并发测试多个输入点，每个输入点在独立的浏览器上下文中提交载荷，页面导航互不干扰
+        
+        Args:
+            page: 当前页面，工作页面复制它的存储状态并打开同一URL
+            targets: (输入点序号, 输入点) 列表
+            test_payloads: 测试载荷
+            os_type: 目标系统类型
+            original_content: 原始页面内容
+            
+        Returns:
+            与targets顺序一致的 (是否存在漏洞, 载荷) 列表
+        """
+        browser = page.context.browser
+        # 只有一个输入点，或无法创建新上下文（例如持久化上下文）时在当前页面上依次测试
+        if len(targets) < 2 or browser is None:
+            return [await self._test_input_point(page, input_point, idx, test_payloads, os_type, original_content) for idx, input_point in targets]
+        
+        # 预先创建上下文池，复制当前页面的Cookie和localStorage
+        storage_state = await page.context.storage_state()
+        pool_size = min(MAX_CONCURRENT_INPUT_TESTS, len(targets))
+        contexts = await asyncio.gather(*(browser.new_context(storage_state=storage_state) for _ in range(pool_size)))
         
-        if os_type == "windows":
-            # 替换基本命令和连接命令为Windows特定命令
-            result["basic"] = self.payloads["windows"][:5]
-            result["concatenated"] = self.payloads["windows"][5:]
+        # 固定数量的工作协程从队列中取出待测输入点，每个工作协程独占一个上下文
+        pending = asyncio.Queue()
+        for position, (idx, input_point) in enumerate(targets):
+            pending.put_nowait((position, idx, input_point))
+        results: List[Tuple[bool, str]] = [(False, "")] * len(targets)
         
-        return result
+        async def worker(context) -> None:
+            try:
+                await context.route("**/*", _block_static_resources)
+                worker_page = await context.new_page()
+            except Exception as e:
+                # 该工作协程无法启动，剩余输入点由其他工作协程继续测试
+                self.record_test_result({
+                    "step": "input_worker",
+                    "status": "error",
+                    "message": f"创建测试页面失败: {str(e)}"
+                })
+                return
+            while not pending.empty():
+                position, idx, input_point = pending.get_nowait()
+                try:
+                    await worker_page.goto(page.url, wait_until="domcontentloaded")
+                    results[position] = await self._test_input_point(
+                        worker_page, input_point, idx, test_payloads, os_type, original_content
+                    )
+                except Exception as e:
+                    # 单个输入点测试失败不影响其他输入点，该输入点记为未发现漏洞
+                    self.record_test_result({
+                        "step": f"testing_input_{idx}",
+                        "status": "error",
+                        "message": f"测试输入点时出错: {str(e)}"
+                    })
+        
+        try:
+            await asyncio.gather(*(worker(context) for context in contexts))
+            return results
+        finally:
+            await asyncio.gather(*(context.close() for context in contexts), return_exceptions=True)
     
     async def _test_input_point(self, page: Page, input_point: Dict[str, Any], idx: int, 
-                               test_payloads: Dict[str, List[str]], os_type: str) -> tuple[bool, str]:
+                               test_payloads: Dict[str, List[str]], os_type: str,
+                               original_content: str) -> tuple[bool, str]:
         """测试特定输入点是否存在命令注入漏洞"""
         selector = input_point["selector"]
         is_vulnerable = False
@@ -209,38 +536,20 @@ class CommandInjectionTester(BaseTester):
             "message": f"正在测试输入点: {input_point.get('name', '') or input_point.get('id', '') or selector}"
         })
         
-        # 保存原始页面内容用于比较
-        original_content = await self.get_page_text(page)
+        original_url = page.url
+        # 提交载荷前的Cookie和localStorage快照，每次提交后恢复，各载荷互不影响
+        storage_state = await page.context.storage_state()
         
-        # 1. 先测试特殊字符是否被过滤
-        for char in test_payloads["special_chars"]:
-            # 发送单个特殊字符
-            await self._input_and_submit(page, selector, char)
-            await asyncio.sleep(1)  # 等待页面响应
-            
-            # 检查是否触发了错误
-            error_content = await self.get_page_text(page)
-            
-            # 检查是否存在命令执行错误提示
-            if self._check_for_error_messages(error_content):
-                self.record_test_result({
-                    "step": f"testing_input_{idx}_special_chars",
-                    "status": "info",
-                    "message": f"特殊字符 '{char}' 可能触发了错误"
-                })
-            
-            # 返回到原始页面
-            await page.go_back()
-            await asyncio.sleep(1)
+        # 提交按钮只查找一次，页面导航后句柄失效时再重新查找
+        submit_button = await self._find_submit_button(page, selector)
         
-        # 2. 测试基本命令
+        # 1. 测试基本命令
         for payload in test_payloads["basic"]:
             # 发送基本命令
-            await self._input_and_submit(page, selector, payload)
-            await asyncio.sleep(1)  # 等待页面响应
+            navigated, _ = await self._submit_payload(page, selector, payload, submit_button)
             
             # 获取响应内容
-            response_content = await self.get_page_text(page)
+            response_content = await self._fast_page_text(page)
             
             # 检查是否有命令执行的迹象
             if self._check_for_command_output(response_content, os_type, original_content):
@@ -258,24 +567,31 @@ class CommandInjectionTester(BaseTester):
                 input_point["vulnerability_types"] = ["command_injection"]
                 input_point["payload"] = payload
                 
-                # 返回到原始页面
-                await page.go_back()
-                await asyncio.sleep(1)
+                # 恢复到原始页面
+                await self._restore_page(page, original_url, navigated, storage_state)
                 
                 return is_vulnerable, vulnerable_payload
             
-            # 返回到原始页面
-            await page.go_back()
-            await asyncio.sleep(1)
+            # 顺带检查是否存在命令执行错误提示，无需再单独提交特殊字符
+            if self._check_for_error_messages(response_content):
+                self.record_test_result({
+                    "step": f"testing_input_{idx}_basic",
+                    "status": "info",
+                    "message": f"载荷 '{payload}' 可能触发了错误"
+                })
+            
+            # 恢复到原始页面
+            await self._restore_page(page, original_url, navigated, storage_state)
+            if navigated:
+                submit_button = await self._find_submit_button(page, selector)
         
-        # 3. 测试连接命令
+        # 2. 测试连接命令
         for payload in test_payloads["concatenated"]:
             # 发送连接命令
-            await self._input_and_submit(page, selector, payload)
-            await asyncio.sleep(1)  # 等待页面响应
+            navigated, _ = await self._submit_payload(page, selector, payload, submit_button)
             
             # 获取响应内容
-            response_content = await self.get_page_text(page)
+            response_content = await self._fast_page_text(page)
             
             # 检查是否有命令执行的迹象
             if self._check_for_command_output(response_content, os_type, original_content):
@@ -293,35 +609,51 @@ class CommandInjectionTester(BaseTester):
                 input_point["vulnerability_types"] = ["command_injection"]
                 input_point["payload"] = payload
                 
-                # 返回到原始页面
-                await page.go_back()
-                await asyncio.sleep(1)
+                # 恢复到原始页面
+                await self._restore_page(page, original_url, navigated, storage_state)
                 
                 return is_vulnerable, vulnerable_payload
             
-            # 返回到原始页面
-            await page.go_back()
-            await asyncio.sleep(1)
-        
-        # 4. 测试盲注命令
-        for payload in test_payloads["blind"]:
-            # 记录开始时间
-            start_time = await page.evaluate("() => performance.now()")
-            
-            # 发送延时命令
-            await self._input_and_submit(page, selector, payload)
-            
-            # 等待一小段时间
-            await asyncio.sleep(1)
-            
-            # 记录结束时间
-            end_time = await page.evaluate("() => performance.now()")
-            
-            # 计算响应时间（毫秒转换为秒）
-            response_time = (end_time - start_time) / 1000
+            # 恢复到原始页面
+            await self._restore_page(page, original_url, navigated, storage_state)
+            if navigated:
+                submit_button = await self._find_submit_button(page, selector)
+        
+        # 3. 测试盲注命令
+        blind_payloads = test_payloads["blind"]
+        browser = page.context.browser
+        if browser is not None and len(blind_payloads) > 1:
+            # 各延时载荷互不依赖，先在复制了快照的独立浏览器上下文中并发计时
+            if self._blind_semaphore is None:
+                self._blind_semaphore = asyncio.Semaphore(MAX_CONCURRENT_BLIND_TESTS)
+            semaphore = self._blind_semaphore
+            response_times = await asyncio.gather(
+                *(self._time_blind_payload_isolated(browser, storage_state, original_url, selector, payload, semaphore)
+                  for payload in blind_payloads),
+                return_exceptions=True
+            )
+            # 并发请求可能在服务端排队（例如同一会话的锁）导致误判，
+            # 只有收到响应且超过阈值的载荷在当前页面上逐个复测确认
+            suspicious_payloads = []
+            for payload, response_time in zip(blind_payloads, response_times):
+                if isinstance(response_time, Exception):
+                    self.record_test_result({
+                        "step": f"testing_input_{idx}_blind",
+                        "status": "error",
+                        "message": f"载荷 '{payload}' 的并发计时失败: {str(response_time)}"
+                    })
+                elif response_time is not None and response_time > self.time_based_threshold:
+                    suspicious_payloads.append(payload)
+            blind_payloads = suspicious_payloads
+        
+        for payload in blind_payloads:
+            # 发送延时命令，响应时间只计算到收到响应为止
+            navigated, response_time = await self._submit_payload(
+                page, selector, payload, submit_button, self._blind_timeout_ms()
+            )
             
-            # 检查是否存在明显延迟
-            if response_time > self.time_based_threshold:
+            # 检查是否存在明显延迟；未收到响应时无法判断，不视为延迟
+            if response_time is not None and response_time > self.time_based_threshold:
                 is_vulnerable = True
                 vulnerable_payload = payload
                 
@@ -336,18 +668,45 @@ class CommandInjectionTester(BaseTester):
                 input_point["vulnerability_types"] = ["command_injection_blind"]
                 input_point["payload"] = payload
                 
-                # 返回到原始页面
-                await page.go_back()
-                await asyncio.sleep(1)
+                # 恢复到原始页面
+                await self._restore_page(page, original_url, navigated, storage_state)
                 
                 return is_vulnerable, vulnerable_payload
             
-            # 返回到原始页面
-            await page.go_back()
-            await asyncio.sleep(1)
+            # 恢复到原始页面
+            await self._restore_page(page, original_url, navigated, storage_state)
+            if navigated:
+                submit_button = await self._find_submit_button(page, selector)
         
         return is_vulnerable, vulnerable_payload
     
+    async def _time_blind_payload_isolated(self, browser, storage_state: Dict[str, Any], url: str, selector: str,
+                                           payload: str, semaphore: asyncio.Semaphore) -> Optional[float]:
+        """
+        在复制了存储状态的独立浏览器上下文中提交一个延时载荷
+        
+        Returns:
+            提交载荷的响应时间（秒），未收到响应时为None
+        """
+        async with semaphore:
+            context = await browser.new_context(storage_state=storage_state)
+            try:
+                await context.route("**/*", _block_static_resources)
+                blind_page = await context.new_page()
+                await blind_page.goto(url, wait_until="domcontentloaded")
+                submit_button = await self._find_submit_button(blind_page, selector)
+                
+                _, response_time = await self._submit_payload(
+                    blind_page, selector, payload, submit_button, self._blind_timeout_ms()
+                )
+                return response_time
+            finally:
+                await context.close()
+    
+    async def _fast_page_text(self, page: Page) -> str:
+        """获取页面文本的前MAX_PAGE_TEXT_LENGTH个字符，避免每次检测都传回整个页面"""
+        return await self.get_page_text(page, limit=MAX_PAGE_TEXT_LENGTH)
+    
     def _check_for_command_output(self, content: str, os_type: str, original_content: str) -> bool:
         """检查页面内容中是否包含命令执行的输出"""
         # 确保内容与原始内容不同
@@ -355,60 +714,166 @@ class CommandInjectionTester(BaseTester):
             return False
         
         # 根据操作系统类型选择检测字符串
-        detection_strings = self.detection_strings["unix"]
-        if os_type == "windows":
-            detection_strings = self.detection_strings["windows"]
+        os_key = "windows" if os_type == "windows" else "unix"
+        return self._contains_detection_string(content, os_key)
+    
+    def _contains_detection_string(self, content: str, os_key: str) -> bool:
+        """检查页面内容中是否包含指定操作系统的任一特征字符串"""
+        if self._hyperscan_database is not None:
+            return os_key in self._scan_signatures(content)
         
-        # 检查是否包含任何特征字符串
-        for string in detection_strings:
-            if string in content:
+        # 一次扫描页面内容，命中任意特征字符串即返回
+        if self._detection_automata is not None:
+            for _ in self._detection_automata[os_key].iter(content):
                 return True
+            return False
         
-        return False
+        # 页面内容只编码一次，逐个按字节查找特征字符串
+        content_bytes = content.encode("utf-8", "ignore")
+        return any(string in content_bytes for string in self._detection_bytes[os_key])
     
     def _check_for_error_messages(self, content: str) -> bool:
         """检查页面内容中是否包含命令执行错误的提示"""
-        error_patterns = [
-            r"command not found",
-            r"syntax error",
-            r"unexpected token",
-            r"unrecognized command",
-            r"is not recognized as",
-            r"<b>Warning</b>",
-            r"<b>Error</b>",
-            r"Fatal error",
-            r"system error",
-            r"sh:",
-            r"bash:",
-            r"cmd:",
-            r"Exception",
-            r"not found in PATH",
-            r"\d+: No such file or directory"
-        ]
+        if self._hyperscan_database is not None:
+            return "error" in self._scan_signatures(content)
+        return _ERROR_RE.search(content) is not None
+    
+    def _scan_signatures(self, content: str) -> frozenset:
+        """用Hyperscan数据库扫描页面内容，返回命中的分组名（操作系统类型或"error"）"""
+        last_content, last_groups = self._last_signature_scan
+        if last_content is content:
+            return last_groups
         
-        for pattern in error_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                return True
+        matched = set()
         
-        return False
+        def on_match(pattern_id: int, start: int, end: int, flags: int, context) -> None:
+            matched.add(self._hyperscan_groups[pattern_id])
+        
+        self._hyperscan_database.scan(content.encode("utf-8", "ignore"), match_event_handler=on_match)
+        groups = frozenset(matched)
+        self._last_signature_scan = (content, groups)
+        return groups
     
-    async def _input_and_submit(self, page: Page, selector: str, value: str) -> None:
-        """输入内容并提交表单"""
+    def _blind_timeout_ms(self) -> int:
+        """盲注载荷的响应超时时间（毫秒），需要超过判断延时的阈值"""
+        return int(self.time_based_threshold * 1000) + SUBMIT_RESPONSE_TIMEOUT_MS
+    
+    async def _submit_payload(self, page: Page, selector: str, value: str,
+                              submit_button: Optional[ElementHandle],
+                              timeout_ms: Optional[int] = None) -> SubmitResult:
+        """
+        提交载荷并等待页面响应
+        
+        先等待提交发出请求（最多SUBMIT_REQUEST_TIMEOUT_MS），再等待该请求的响应到达：
+        页面导航时再等待新文档的DOM加载完成，AJAX提交则短暂等待页面脚本更新DOM。
+        没有发出请求或超时未收到响应时按当前页面状态继续，响应时间记为None，
+        调用方不能把它当作服务器延迟
+        
+        Args:
+            page: 当前页面
+            selector: 输入框选择器
+            value: 载荷
+            submit_button: _find_submit_button找到的提交按钮，为None时按回车提交
+            timeout_ms: 等待响应的超时时间（毫秒），默认SUBMIT_RESPONSE_TIMEOUT_MS
+        
+        Returns:
+            SubmitResult(是否发生了导航, 响应时间)
+        """
+        if timeout_ms is None:
+            timeout_ms = SUBMIT_RESPONSE_TIMEOUT_MS
+        navigated = False
+        response_time = None
+        
+        def on_frame_navigated(frame) -> None:
+            nonlocal navigated
+            if frame == page.main_frame:
+                navigated = True
+        
+        page.on("framenavigated", on_frame_navigated)
+        # 提交前开始等待DOMContentLoaded，避免新文档加载过快而错过事件
+        dom_loaded = asyncio.ensure_future(page.wait_for_event("domcontentloaded", timeout=timeout_ms))
         try:
-            # 清除原有内容
-            await page.fill(selector, "")
-            # 输入新内容
-            await page.fill(selector, value)
+            start_time = time.perf_counter()
+            async with page.expect_request(_is_submit_request, timeout=SUBMIT_REQUEST_TIMEOUT_MS) as request_info:
+                await self._input_and_submit(page, selector, value, submit_button)
+            request = await request_info.value
             
-            # 查找可能的提交按钮
+            response = await asyncio.wait_for(request.response(), timeout_ms / 1000)
+            if response is not None:
+                response_time = time.perf_counter() - start_time
+                if request.is_navigation_request():
+                    await dom_loaded
+                else:
+                    await asyncio.sleep(RESPONSE_SETTLE_DELAY)
+        except (PlaywrightTimeoutError, asyncio.TimeoutError):
+            # 提交没有产生请求，或服务器在超时内没有响应，结果不确定
+            pass
+        finally:
+            if not dom_loaded.done():
+                dom_loaded.cancel()
+            try:
+                await dom_loaded
+            except (asyncio.CancelledError, Exception):
+                pass
+            page.remove_listener("framenavigated", on_frame_navigated)
+        
+        return SubmitResult(navigated, response_time)
+    
+    async def _restore_page(self, page: Page, original_url: str, navigated: bool,
+                            storage_state: Dict[str, Any]) -> None:
+        """
+        恢复到提交载荷前的页面
+        
+        先取一次当前的存储状态，只有Cookie或原始页面所在源的localStorage与快照不同时才恢复；
+        提交导致导航时重新打开原始URL（只等待DOM加载完成）。未导航时页面仍停留在原处，
+        下一次提交前_input_and_submit会重新填写输入框
+        """
+        try:
+            current_state = await page.context.storage_state()
+        except Exception:
+            # 无法比较时按存储已被修改处理
+            current_state = {}
+        
+        if _cookie_keys(current_state) != _cookie_keys(storage_state):
+            await page.context.clear_cookies()
+            if storage_state.get("cookies"):
+                await page.context.add_cookies(storage_state["cookies"])
+        
+        if navigated:
+            await page.goto(original_url, wait_until="domcontentloaded")
+        
+        local_storage = _origin_local_storage(storage_state, original_url)
+        if _origin_local_storage(current_state, original_url) != local_storage or not current_state:
+            try:
+                await page.evaluate(_RESTORE_LOCAL_STORAGE_JS, local_storage)
+            except Exception:
+                # 例如页面不允许访问localStorage
+                pass
+    
+    async def _find_submit_button(self, page: Page, selector: str) -> Optional[ElementHandle]:
+        """查找输入框所在表单的提交按钮，输入框不在表单中或表单没有按钮时返回None"""
+        try:
             form = await page.query_selector(f"{selector} >> xpath=ancestor::form")
-            
             if form:
-                # 如果输入在表单中，查找表单的提交按钮
-                submit_button = await form.query_selector('input[type="submit"], button[type="submit"], button:has-text("Submit"), button')
-                if submit_button:
+                return await form.query_selector('input[type="submit"], button[type="submit"], button:has-text("Submit"), button')
+        except Exception:
+            pass
+        return None
+    
+    async def _input_and_submit(self, page: Page, selector: str, value: str,
+                                submit_button: Optional[ElementHandle]) -> None:
+        """输入内容并提交表单"""
+        try:
+            # fill会先清空原有内容再输入，一次调用即可
+            await page.fill(selector, value)
+            
+            if submit_button:
+                try:
                     await submit_button.click()
                     return
+                except Exception:
+                    # 句柄可能随DOM更新失效，改为按回车提交
+                    pass
             
             # 如果没有找到提交按钮，尝试按回车键
             await page.press(selector, "Enter")
@@ -426,53 +891,42 @@ class CommandInjectionTester(BaseTester):
         }
         
         # 保存原始内容
-        original_content = await self.get_page_text(page)
+        original_content = await self._fast_page_text(page)
+        original_url = page.url
+        # 提交载荷前的Cookie和localStorage快照，每次提交后恢复，各载荷互不影响
+        storage_state = await page.context.storage_state()
+        navigated = False
+        submit_button = await self._find_submit_button(page, input_selector)
         
         try:
             # 判断载荷类型
             if any(sleep_cmd in payload for sleep_cmd in ["sleep", "timeout"]):
-                # 处理盲注类型
-                start_time = await page.evaluate("() => performance.now()")
-                
-                # 注入载荷
-                await self._input_and_submit(page, input_selector, payload)
-                
-                # 等待一小段时间
-                await asyncio.sleep(1)
+                # 处理盲注类型，注入载荷并等待响应，未收到响应时无法判断
+                navigated, response_time = await self._submit_payload(
+                    page, input_selector, payload, submit_button, self._blind_timeout_ms()
+                )
                 
-                # 获取结束时间
-                end_time = await page.evaluate("() => performance.now()")
-                
-                # 计算响应时间（毫秒转换为秒）
-                response_time = (end_time - start_time) / 1000
-                
-                if response_time > self.time_based_threshold:
+                if response_time is not None and response_time > self.time_based_threshold:
                     result["vulnerable"] = True
                     result["details"] = f"验证成功，延时载荷执行，响应时间: {response_time:.2f}秒"
             else:
-                # 处理普通命令注入
-                await self._input_and_submit(page, input_selector, payload)
-                
-                # 等待页面响应
-                await asyncio.sleep(1)
+                # 处理普通命令注入，注入载荷并等待页面响应
+                navigated, _ = await self._submit_payload(page, input_selector, payload, submit_button)
                 
                 # 获取响应内容
-                injected_content = await self.get_page_text(page)
+                injected_content = await self._fast_page_text(page)
                 
                 # 自动检测操作系统类型
-                os_type = "unix"
-                if any(win_str in injected_content for win_str in self.detection_strings["windows"]):
-                    os_type = "windows"
+                os_type = "windows" if self._contains_detection_string(injected_content, "windows") else "unix"
                 
                 # 检查是否有命令执行的迹象
                 if self._check_for_command_output(injected_content, os_type, original_content):
                     result["vulnerable"] = True
                     result["details"] = f"验证成功，命令执行的输出被检测到"
         finally:
-            # 返回到原始页面
+            # 恢复到原始页面
             try:
-                await page.go_back()
-                await asyncio.sleep(1)
+                await self._restore_page(page, original_url, navigated, storage_state)
             except:
                 pass
         
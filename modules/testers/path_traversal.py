@@ -5,6 +5,33 @@ import re
 
 from .base_tester import BaseTester
 
+# 可选：安装pyahocorasick时用Aho-Corasick自动机一次扫描页面内容中的所有纯文本特征
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# 敏感内容检测只扫描页面的前MAX_SCAN_LENGTH个字符，检测特征无需解析整个响应
+MAX_SCAN_LENGTH = 262144
+
+# URL中的Unix/Windows路径特征，用于推测目标系统类型
+_UNIX_PATH_RE = re.compile(r'(?:/var/|/etc/|/usr/|/home/)')
+_WINDOWS_PATH_RE = re.compile(r'(?:c:|d:|e:|\w:\\|\w:%5c)', re.IGNORECASE)
+
+def _build_literal_automaton(literal_map: Dict[str, tuple]):
+    """用各类敏感内容的小写纯文本特征构建Aho-Corasick自动机，匹配值为特征所属的类别"""
+    signature_types = {}
+    for content_type, signatures in literal_map.items():
+        for signature in signatures:
+            signature_types.setdefault(signature, set()).add(content_type)
+    
+    automaton = ahocorasick.Automaton()
+    for signature, content_types in signature_types.items():
+        automaton.add_word(signature, frozenset(content_types))
+    automaton.make_automaton()
+    return automaton
+
 class PathTraversalTester(BaseTester):
     """目录穿越漏洞测试模块"""
     
@@ -60,48 +87,70 @@ class PathTraversalTester(BaseTester):
                 "../../server.js"
             ]
         }
-        self.sensitive_content_patterns = {
+        # 敏感文件特征：纯文本特征按子串匹配（不区分大小写），只有真正需要正则的特征才用正则匹配
+        self.literal_signatures = {
             "unix": [
-                r"root:.*:0:0:",  # /etc/passwd
-                r"Host.*localhost",  # /etc/hosts
-                r"GNU/Linux",  # /etc/issue
-                r"HTTP_USER_AGENT",  # /proc/self/environ
-                r"Failed password",  # auth.log
-                r"GET /.*HTTP/1"  # apache logs
+                "GNU/Linux",  # /etc/issue
+                "HTTP_USER_AGENT",  # /proc/self/environ
+                "Failed password"  # auth.log
             ],
             "windows": [
-                r"\[fonts\]",  # win.ini
-                r"\[boot loader\]",  # boot.ini
-                r"\[system\]",  # system.ini
-                r"127\.0\.0\.1\s+localhost",  # hosts file
-                r"Default Paths for NetSetup Logs",  # NetSetup.log
-                r"DPAPI",  # SAM files
-                r"IIS configuration file"  # asa/aspx files
+                "[fonts]",  # win.ini
+                "[boot loader]",  # boot.ini
+                "[system]",  # system.ini
+                "Default Paths for NetSetup Logs",  # NetSetup.log
+                "DPAPI",  # SAM files
+                "IIS configuration file"  # asa/aspx files
             ],
             "web_configs": [
-                r"<configuration>",
-                r"<connectionStrings>",
-                r"<system.web>",
-                r"<appSettings>",
-                r"<web-app",
-                r"<servlet-mapping"
+                "<configuration>",
+                "<connectionStrings>",
+                "<system.web>",
+                "<appSettings>",
+                "<web-app",
+                "<servlet-mapping"
             ],
             "source_code": [
-                r"<?php",
-                r"<\?php",
-                r"import os",
-                r"using System;",
-                r"namespace",
-                r"function",
-                r"const express = require",
-                r"public class",
-                r"private"
+                "<?php",
+                "import os",
+                "using System;",
+                "namespace",
+                "function",
+                "const express = require",
+                "public class",
+                "private"
+            ]
+        }
+        self.regex_signatures = {
+            "unix": [
+                # 通配部分限定在单行内并限制长度，避免在大页面上反复回溯
+                r"root:[^\n]{0,256}:0:0:",  # /etc/passwd
+                r"Host[^\n]{0,256}localhost",  # /etc/hosts
+                r"GET /[^\r\n]{0,2048}HTTP/1"  # apache logs
+            ],
+            "windows": [
+                r"127\.0\.0\.1\s+localhost"  # hosts file
             ]
         }
         self.path_parameter_patterns = [
             r"(?:^|&|\?)(?:path|file|doc|page|filename|filepath|load|url|download|dir|show|view|include)=([^&]*)",
             r"(?:^|&|\?)(?:img|image|src|dest|destination|redirect|uri|target|site)=([^&]*)"
         ]
+        # 各类敏感内容按声明顺序检测
+        self._content_types = tuple(dict.fromkeys([*self.literal_signatures, *self.regex_signatures]))
+        # 纯文本特征统一转为小写，与小写化的页面内容比较
+        self._literal_lower = {
+            content_type: tuple(signature.lower() for signature in signatures)
+            for content_type, signatures in self.literal_signatures.items()
+        }
+        self._literal_automaton = _build_literal_automaton(self._literal_lower) if AHOCORASICK_AVAILABLE else None
+        # 正则只编译一次，检测时直接使用编译后的对象；
+        # 每类敏感内容的正则合并为一个，每类只需扫描一次页面内容
+        self._sensitive_union = {
+            content_type: re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+            for content_type, patterns in self.regex_signatures.items()
+        }
+        self._compiled_path_params = [re.compile(pattern, re.IGNORECASE) for pattern in self.path_parameter_patterns]
         self.vulnerable_params = []
     
     async def test(self, target: Dict[str, Any]) -> Dict[str, Any]:
@@ -184,9 +233,8 @@ class PathTraversalTester(BaseTester):
         """从URL中提取可能与文件路径相关的参数"""
         params = []
         
-        for pattern in self.path_parameter_patterns:
-            matches = re.finditer(pattern, url, re.IGNORECASE)
-            for match in matches:
+        for pattern in self._compiled_path_params:
+            for match in pattern.finditer(url):
                 param_name = match.group(0).split('=')[0].strip('?&')
                 param_value = match.group(1)
                 params.append({
@@ -280,6 +328,7 @@ class PathTraversalTester(BaseTester):
     async def _test_form_inputs(self, page: Page, input_points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """测试表单输入是否存在目录穿越漏洞"""
         vulnerable_inputs = []
+        page_url = page.url
         
         for idx, input_point in enumerate(input_points):
             # 跳过不适合路径穿越的输入类型
@@ -343,6 +392,7 @@ class PathTraversalTester(BaseTester):
                     self.record_vulnerability({
                         "input_point": input_point,
                         "vulnerability": "path_traversal",
+                        "url": page_url,
                         "payload": payload,
                         "content_type": content_type,
                         "details": f"表单输入 {input_point.get('name', '')} 存在目录穿越漏洞，可访问: {content_type} 类型文件"
@@ -367,10 +417,29 @@ class PathTraversalTester(BaseTester):
             return False, ""
         
         # 遍历所有敏感内容模式
-        for content_type, patterns in self.sensitive_content_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, content, re.IGNORECASE):
+        if len(content) > MAX_SCAN_LENGTH:
+            content = content[:MAX_SCAN_LENGTH]
+        
+        # 页面内容只转换一次小写，纯文本特征按子串匹配
+        content_lower = content.lower()
+        
+        literal_hits = None
+        if self._literal_automaton is not None:
+            # 一次扫描找出命中纯文本特征的所有类别
+            literal_hits = set()
+            for _, content_types in self._literal_automaton.iter(content_lower):
+                literal_hits.update(content_types)
+        
+        for content_type in self._content_types:
+            if literal_hits is not None:
+                if content_type in literal_hits:
                     return True, content_type
+            elif any(signature in content_lower for signature in self._literal_lower.get(content_type, ())):
+                return True, content_type
+            
+            pattern = self._sensitive_union.get(content_type)
+            if pattern is not None and pattern.search(content):
+                return True, content_type
         
         return False, ""
     
@@ -450,10 +519,10 @@ class PathTraversalTester(BaseTester):
             return "windows"
         
         # 3. 检查常见Windows和Unix路径格式
-        if re.search(r'(?:/var/|/etc/|/usr/|/home/)', current_url):
+        if _UNIX_PATH_RE.search(current_url):
             return "unix"
             
-        if re.search(r'(?:c:|d:|e:|\w:\\|\w:%5c)', current_url, re.IGNORECASE):
+        if _WINDOWS_PATH_RE.search(current_url):
             return "windows"
         
         # 默认使用Unix
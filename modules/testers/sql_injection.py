@@ -111,6 +111,7 @@ class SQLInjectionTester(BaseTester):
         
         # 测试每个输入点
         vulnerable_inputs = []
+        page_url = page.url
         
         for idx, input_point in enumerate(input_points):
             # 跳过不适合SQL注入的输入类型
@@ -127,6 +128,7 @@ class SQLInjectionTester(BaseTester):
                 self.record_vulnerability({
                     "input_point": input_point,
                     "vulnerability": "sql_injection",
+                    "url": page_url,
                     "details": "该输入点存在SQL注入漏洞"
                 })
                 
@@ -86,6 +86,7 @@ class XSSTester(BaseTester):
         
         # 测试每个输入点
         vulnerable_inputs = []
+        page_url = page.url
         
         for idx, input_point in enumerate(input_points):
             # 跳过不适合XSS的输入类型
@@ -103,6 +104,7 @@ class XSSTester(BaseTester):
                 self.record_vulnerability({
                     "input_point": input_point,
                     "vulnerability": "xss",
+                    "url": page_url,
                     "context": context,
                     "details": f"该输入点存在XSS漏洞，上下文类型: {context}"
                 })
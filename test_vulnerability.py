@@ -15,7 +15,7 @@ from playwright.async_api import async_playwright
 
 # 导入Agent类和测试模块
 from agent import Agent
-from modules.testers import TESTER_MAP
+from modules.testers import TESTER_MAP, get_tester
 
 # 配置日志
 logging.basicConfig(
@@ -51,7 +51,7 @@ async def run_vulnerability_test(url, vulnerability_type, headless=True):
         await agent.goto(url, wait_for_load=True)
         
         # 初始化测试模块并执行测试
-        tester_class = TESTER_MAP[vulnerability_type]
+        tester_class = get_tester(vulnerability_type)
         tester = tester_class(agent)
         
         # 运行测试
@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+命令注入测试模块的测试
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+import modules.testers.command_injection as command_injection
+from modules.testers.command_injection import CommandInjectionTester
+
+# 测试中使用的判断阈值（秒），远小于真实值以加快测试
+THRESHOLD = 0.2
+
+class FakeRequest:
+    """模拟表单提交产生的请求，delay为None时服务器永不响应"""
+    
+    def __init__(self, delay, navigation):
+        self.resource_type = "document" if navigation else "xhr"
+        self._delay = delay
+        self._navigation = navigation
+    
+    def is_navigation_request(self):
+        return self._navigation
+    
+    async def response(self):
+        if self._delay is None:
+            await asyncio.sleep(3600)
+        await asyncio.sleep(self._delay)
+        return object()
+
+class FakeRequestInfo:
+    """模拟expect_request返回的事件信息"""
+    
+    def __init__(self):
+        self.future = asyncio.get_running_loop().create_future()
+    
+    @property
+    def value(self):
+        return self.future
+
+class FakeExpectRequest:
+    """模拟page.expect_request：退出时在超时内等待请求发出"""
+    
+    def __init__(self, page, timeout):
+        self.page = page
+        self.timeout = timeout
+    
+    async def __aenter__(self):
+        self.info = FakeRequestInfo()
+        self.page.request_waiters.append(self.info.future)
+        return self.info
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await asyncio.wait_for(asyncio.shield(self.info.future), self.timeout / 1000)
+        except asyncio.TimeoutError:
+            raise PlaywrightTimeoutError("等待请求超时")
+        finally:
+            self.page.request_waiters.remove(self.info.future)
+        return False
+
+class FakeContext:
+    """模拟浏览器上下文，browser为None时测试在当前页面上依次进行"""
+    
+    def __init__(self, browser=None):
+        self.browser = browser
+        self.closed = False
+        self.cookies = []
+        self.cleared = 0
+    
+    async def storage_state(self):
+        return {"cookies": list(self.cookies), "origins": []}
+    
+    async def clear_cookies(self):
+        self.cookies = []
+        self.cleared += 1
+    
+    async def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+    
+    async def route(self, pattern, handler):
+        pass
+    
+    async def new_page(self):
+        return self.browser.page_factory(self)
+    
+    async def close(self):
+        self.closed = True
+
+class FakeBrowser:
+    """模拟浏览器，page_factory(context) 创建新上下文中的页面"""
+    
+    def __init__(self, page_factory):
+        self.page_factory = page_factory
+        self.contexts = []
+    
+    async def new_context(self, storage_state=None):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+class FakePage:
+    """
+    模拟Playwright页面
+    
+    Args:
+        sends_request: 提交时是否发出请求
+        delays: 载荷 -> 服务器响应前的延迟（秒），None表示永不响应
+        default_delay: 未在delays中列出的载荷的延迟
+    """
+    
+    def __init__(self, sends_request=True, delays=None, default_delay=0.0, context=None):
+        self.url = "http://target/form"
+        self.main_frame = object()
+        self.context = context or FakeContext()
+        self.sends_request = sends_request
+        self.delays = delays or {}
+        self.default_delay = default_delay
+        self.request_waiters = []
+        self.value = ""
+        self.submitted = []
+        self.goto_error = None
+        self.visited = []
+        self.scripts = []
+    
+    def on(self, event, callback):
+        pass
+    
+    def remove_listener(self, event, callback):
+        pass
+    
+    def expect_request(self, predicate, timeout=None):
+        return FakeExpectRequest(self, timeout)
+    
+    async def wait_for_event(self, event, timeout=None):
+        await asyncio.sleep(timeout / 1000)
+        raise PlaywrightTimeoutError("等待事件超时")
+    
+    async def fill(self, selector, value):
+        self.value = value
+    
+    async def press(self, selector, key):
+        self.submitted.append(self.value)
+        if not self.sends_request:
+            return
+        request = FakeRequest(self.delays.get(self.value, self.default_delay), navigation=False)
+        for future in self.request_waiters:
+            if not future.done():
+                future.set_result(request)
+    
+    async def query_selector(self, selector):
+        return None
+    
+    async def evaluate(self, script, arg=None):
+        self.scripts.append(script)
+        if "createTreeWalker" in script:
+            return "hello"
+        return None
+    
+    async def goto(self, url, wait_until=None):
+        if self.goto_error is not None:
+            raise self.goto_error
+        self.visited.append(url)
+        self.url = url
+
+@pytest.fixture
+def tester(monkeypatch):
+    """创建使用较短超时的命令注入测试器，不读写载荷命中统计文件"""
+    monkeypatch.setattr(command_injection, "SUBMIT_REQUEST_TIMEOUT_MS", 50)
+    monkeypatch.setattr(command_injection, "SUBMIT_RESPONSE_TIMEOUT_MS", 100)
+    monkeypatch.setattr(command_injection, "RESPONSE_SETTLE_DELAY", 0)
+    monkeypatch.setattr(command_injection, "_payload_wins", command_injection.Counter())
+    tester = CommandInjectionTester(None)
+    tester.time_based_threshold = THRESHOLD
+    return tester
+
+def run_input_point(tester, page):
+    """用Unix载荷测试一个文本输入点"""
+    payloads = tester._select_payloads("unix")
+    input_point = {"selector": "#q", "name": "q", "type": "text"}
+    return asyncio.run(tester._test_input_point(page, input_point, 0, payloads, "unix", "hello"))
+
+class TestSubmitPayload:
+    """测试提交载荷后的等待和响应计时"""
+    
+    def test_no_request_is_inconclusive(self, tester):
+        """提交没有发出请求时响应时间为None，且不会等满盲注超时"""
+        page = FakePage(sends_request=False)
+        
+        start = time.perf_counter()
+        result = asyncio.run(tester._submit_payload(page, "#q", "id", None, tester._blind_timeout_ms()))
+        
+        assert result.response_time is None
+        assert result.navigated is False
+        assert time.perf_counter() - start < THRESHOLD
+    
+    def test_no_response_is_inconclusive(self, tester):
+        """请求发出但服务器在超时内没有响应时，响应时间为None"""
+        page = FakePage(default_delay=None)
+        
+        result = asyncio.run(tester._submit_payload(page, "#q", "id", None, tester._blind_timeout_ms()))
+        
+        assert result.response_time is None
+    
+    def test_response_time_measured(self, tester):
+        """收到响应时记录从提交到响应的时间"""
+        page = FakePage(default_delay=0.05)
+        
+        result = asyncio.run(tester._submit_payload(page, "#q", "id", None))
+        
+        assert 0.05 <= result.response_time < THRESHOLD
+
+class TestBlindDetection:
+    """测试盲注的延时判断"""
+    
+    def test_never_responding_page_is_not_vulnerable(self, tester):
+        """页面从不发出请求时不能报告盲注漏洞"""
+        page = FakePage(sends_request=False)
+        
+        assert run_input_point(tester, page) == (False, "")
+    
+    def test_unanswered_requests_are_not_vulnerable(self, tester):
+        """服务器从不响应时超时不能被当作延迟"""
+        page = FakePage(default_delay=None)
+        
+        assert run_input_point(tester, page) == (False, "")
+    
+    def test_delayed_payload_is_vulnerable(self, tester):
+        """只有真正延迟响应的载荷被报告为盲注漏洞"""
+        page = FakePage(delays={"$(sleep 5)": THRESHOLD + 0.05})
+        
+        is_vulnerable, payload = run_input_point(tester, page)
+        
+        assert is_vulnerable
+        assert payload == "$(sleep 5)"
+    
+    def test_failed_isolated_timing_is_not_confirmed(self, tester):
+        """并发计时失败的载荷记录为错误，不在当前页面上复测"""
+        def broken_page(context):
+            page = FakePage(context=context)
+            page.goto_error = RuntimeError("页面打开失败")
+            return page
+        
+        page = FakePage(context=FakeContext(FakeBrowser(broken_page)))
+        
+        assert run_input_point(tester, page) == (False, "")
+        assert not set(page.submitted) & set(tester.payloads["blind"])
+        errors = [detail for detail in tester.test_results["details"] if detail["status"] == "error"]
+        assert len(errors) == len(tester.payloads["blind"])
+    
+    def test_queued_isolated_timing_is_rejected_by_confirmation(self, tester):
+        """并发计时中因排队变慢的载荷在当前页面上复测后被排除"""
+        slow = THRESHOLD + 0.05
+        browser = FakeBrowser(lambda context: FakePage(context=context, delays={"$(sleep 5)": slow, ";sleep 5;": slow}))
+        page = FakePage(context=FakeContext(browser), delays={";sleep 5;": slow})
+        
+        assert run_input_point(tester, page) == (True, ";sleep 5;")
+        assert "$(sleep 5)" in page.submitted
+        assert all(context.closed for context in browser.contexts)
+
+class TestInputPointWorkers:
+    """测试并发测试输入点的工作协程"""
+    
+    def test_failing_input_point_does_not_abort_others(self, tester):
+        """单个输入点出错时记录错误，其他输入点的结果照常返回"""
+        async def fake_test_input_point(page, input_point, idx, test_payloads, os_type, original_content):
+            if idx == 1:
+                raise RuntimeError("页面已关闭")
+            return True, f"payload{idx}"
+        
+        tester._test_input_point = fake_test_input_point
+        browser = FakeBrowser(lambda context: FakePage(context=context))
+        page = FakePage(context=FakeContext(browser))
+        targets = [(idx, {"selector": f"#q{idx}", "type": "text"}) for idx in range(5)]
+        
+        results = asyncio.run(tester._test_input_points(page, targets, {}, "unix", "hello"))
+        
+        assert results == [(True, "payload0"), (False, ""), (True, "payload2"), (True, "payload3"), (True, "payload4")]
+        assert [detail["step"] for detail in tester.test_results["details"] if detail["status"] == "error"] == ["testing_input_1"]
+        assert all(context.closed for context in browser.contexts)
+
+    def test_blind_timing_limit_is_shared_across_input_points(self, tester, monkeypatch):
+        """并发测试的输入点共用延时载荷计时的并发上限"""
+        monkeypatch.setattr(command_injection, "MAX_CONCURRENT_BLIND_TESTS", 2)
+        browser = FakeBrowser(lambda context: FakePage(context=context, default_delay=0.02))
+        page = FakePage(context=FakeContext(browser))
+        payloads = tester._select_payloads("unix")
+        targets = [(idx, {"selector": f"#q{idx}", "name": f"q{idx}", "type": "text"}) for idx in range(4)]
+        
+        open_contexts = []
+        original_new_context = browser.new_context
+        
+        async def counting_new_context(storage_state=None):
+            context = await original_new_context(storage_state)
+            original_close = context.close
+            
+            async def close():
+                await original_close()
+                open_contexts.append(sum(not c.closed for c in browser.contexts))
+            
+            context.close = close
+            open_contexts.append(sum(not c.closed for c in browser.contexts))
+            return context
+        
+        browser.new_context = counting_new_context
+        asyncio.run(tester._test_input_points(page, targets, payloads, "unix", "hello"))
+        
+        # 工作协程的上下文池之外，同时打开的计时上下文不超过上限
+        pool_size = min(command_injection.MAX_CONCURRENT_INPUT_TESTS, len(targets))
+        assert max(open_contexts) <= pool_size + 2
+    
+class TestRestorePage:
+    """测试提交载荷后恢复页面状态"""
+    
+    SNAPSHOT = {"cookies": [{"name": "session", "value": "abc", "domain": "target", "path": "/"}], "origins": []}
+    
+    def test_unchanged_storage_is_not_restored(self, tester):
+        """存储未被修改且没有导航时不清空Cookie、不重新打开页面"""
+        page = FakePage()
+        page.context.cookies = list(self.SNAPSHOT["cookies"])
+        
+        asyncio.run(tester._restore_page(page, page.url, False, self.SNAPSHOT))
+        
+        assert page.context.cleared == 0
+        assert page.visited == []
+        assert page.scripts == []
+    
+    def test_changed_cookies_are_restored(self, tester):
+        """载荷修改了Cookie时恢复为快照中的Cookie"""
+        page = FakePage()
+        page.context.cookies = [{"name": "session", "value": "changed", "domain": "target", "path": "/"}]
+        
+        asyncio.run(tester._restore_page(page, page.url, False, self.SNAPSHOT))
+        
+        assert page.context.cleared == 1
+        assert page.context.cookies == self.SNAPSHOT["cookies"]
+    
+    def test_navigation_reopens_original_url(self, tester):
+        """提交导致导航时重新打开原始URL"""
+        page = FakePage()
+        page.context.cookies = list(self.SNAPSHOT["cookies"])
+        
+        asyncio.run(tester._restore_page(page, "http://target/form", True, self.SNAPSHOT))
+        
+        assert page.visited == ["http://target/form"]
+        assert page.context.cleared == 0
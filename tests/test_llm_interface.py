@@ -7,11 +7,13 @@ LLM接口测试
 
 import os
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
 import json
 
 # 导入要测试的模块
-from modules.llm_interface import LLMInterface
+from openai import APITimeoutError
+from modules.llm_interface import LLMInterface, TokenBucket, BREAKER_FAILURE_THRESHOLD
 
 class TestLLMInterface:
     """测试LLM接口类"""
@@ -23,10 +25,14 @@ class TestLLMInterface:
         os.environ['SILICONFLOW_API_KEY'] = 'test_api_key'
         
         # 使用补丁模拟OpenAI客户端
-        with patch('modules.llm_interface.OpenAI') as mock_openai:
+        with patch('modules.llm_interface.OpenAI') as mock_openai, \
+             patch('modules.llm_interface.AsyncOpenAI') as mock_async_openai:
             # 配置模拟对象
             mock_client = MagicMock()
             mock_openai.return_value = mock_client
+            mock_async_client = MagicMock()
+            mock_async_client.chat.completions.create = AsyncMock()
+            mock_async_openai.return_value = mock_async_client
             
             # 创建接口实例
             llm = LLMInterface(
@@ -37,6 +43,7 @@ class TestLLMInterface:
             
             # 注入模拟客户端
             llm.client = mock_client
+            llm.aclient = mock_async_client
             yield llm
     
     def test_initialization(self, llm_interface):
@@ -96,7 +103,7 @@ class TestLLMInterface:
         
         # 验证结果
         assert result == '备选响应'
-        assert llm_interface.call_count == 2  # 两次调用
+        assert llm_interface.call_count == 1  # 回退到备选模型仍计为一次调用
         assert llm_interface.error_count == 1  # 一次错误
         assert llm_interface.current_model == 'backup-model'  # 已经切换到备选模型
         assert llm_interface.total_tokens == 15
@@ -118,6 +125,213 @@ class TestLLMInterface:
         assert llm_interface.call_count == 1
         assert llm_interface.error_count == 1
     
+    def test_chat_completion_stream(self, llm_interface):
+        """测试流式聊天补全"""
+        def make_chunk(content, usage=None):
+            chunk = MagicMock()
+            chunk.choices = [MagicMock()]
+            chunk.choices[0].delta.content = content
+            chunk.usage = usage
+            return chunk
+        
+        llm_interface.client.chat.completions.create.return_value = iter([
+            make_chunk('流式'),
+            make_chunk(None),
+            make_chunk('响应', usage=MagicMock(prompt_tokens=3, completion_tokens=4))
+        ])
+        
+        messages = [{"role": "user", "content": "测试消息"}]
+        pieces = list(llm_interface.chat_completion_stream(messages))
+        
+        assert pieces == ['流式', '响应']
+        assert llm_interface.call_count == 1
+        assert llm_interface.total_tokens == 7
+        assert llm_interface.client.chat.completions.create.call_args[1]['stream'] is True
+        assert llm_interface.client.chat.completions.create.call_args[1]['stream_options'] == {"include_usage": True}
+    
+    def test_chat_completion_cache(self, llm_interface):
+        """测试确定性请求命中响应缓存"""
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = '缓存响应'
+        mock_response.usage.prompt_tokens = 10
+        mock_response.usage.completion_tokens = 20
+        llm_interface.client.chat.completions.create.return_value = mock_response
+        
+        messages = [{"role": "user", "content": "测试消息"}]
+        first = llm_interface.chat_completion(messages, temperature=0)
+        second = llm_interface.chat_completion(messages, temperature=0)
+        
+        # 第二次请求直接命中缓存，不再调用API
+        assert first == second == '缓存响应'
+        assert llm_interface.client.chat.completions.create.call_count == 1
+        assert llm_interface.call_count == 1
+        assert llm_interface.cache_stats == {"hits": 1, "misses": 1}
+        
+        # 非确定性请求不使用缓存
+        llm_interface.chat_completion(messages, temperature=0.7)
+        assert llm_interface.client.chat.completions.create.call_count == 2
+    
+    def test_circuit_breaker_opens_after_repeated_timeouts(self, llm_interface):
+        """测试连续超时后熔断器打开并跳过API调用"""
+        llm_interface.client.chat.completions.create.side_effect = APITimeoutError(request=MagicMock())
+        
+        messages = [{"role": "user", "content": "测试消息"}]
+        for _ in range(BREAKER_FAILURE_THRESHOLD):
+            assert llm_interface.chat_completion(messages, use_backup_on_failure=False) is None
+        
+        assert llm_interface._breakers['test-model']['state'] == 'open'
+        
+        # 熔断期间不再发起网络请求
+        calls_before = llm_interface.client.chat.completions.create.call_count
+        assert llm_interface.chat_completion(messages, use_backup_on_failure=False) is None
+        assert llm_interface.client.chat.completions.create.call_count == calls_before
+        
+        # 冷却期结束后放行一次探测请求，成功则关闭熔断器
+        llm_interface._breakers['test-model']['opened_at'] = 0
+        llm_interface.client.chat.completions.create.side_effect = None
+        llm_interface.client.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content='恢复响应'))],
+            usage=MagicMock(prompt_tokens=1, completion_tokens=1)
+        )
+        assert llm_interface.chat_completion(messages, use_backup_on_failure=False) == '恢复响应'
+        assert llm_interface._breakers['test-model']['state'] == 'closed'
+    
+    def test_abandoned_stream_reopens_half_open_breaker(self, llm_interface):
+        """测试半开状态下探测流被中途放弃时熔断器重新打开"""
+        chunk = MagicMock()
+        chunk.choices = [MagicMock()]
+        chunk.choices[0].delta.content = '片段'
+        chunk.usage = None
+        response = MagicMock()
+        response.__iter__.return_value = iter([chunk, chunk])
+        llm_interface.client.chat.completions.create.return_value = response
+        llm_interface._breakers['test-model'] = {"state": "open", "failures": [], "opened_at": 0}
+        
+        messages = [{"role": "user", "content": "测试消息"}]
+        stream = llm_interface.chat_completion_stream(messages)
+        assert next(stream) == '片段'
+        assert llm_interface._breakers['test-model']['state'] == 'half_open'
+        
+        stream.close()
+        assert llm_interface._breakers['test-model']['state'] == 'open'
+        # 放弃的流式响应被关闭，连接归还连接池
+        response.close.assert_called_once()
+    
+    def test_achat_completion_failure_with_backup(self, llm_interface):
+        """测试异步聊天补全失败时使用备选模型"""
+        llm_interface.aclient.chat.completions.create.side_effect = [
+            Exception("模型不可用"),
+            MagicMock(
+                choices=[MagicMock(message=MagicMock(content='备选响应'))],
+                usage=MagicMock(prompt_tokens=5, completion_tokens=10)
+            )
+        ]
+        
+        messages = [{"role": "user", "content": "测试消息"}]
+        result = asyncio.run(llm_interface.achat_completion(messages))
+        
+        assert result == '备选响应'
+        assert llm_interface.error_count == 1
+        assert llm_interface.current_model == 'backup-model'
+        assert llm_interface.total_tokens == 15
+        assert llm_interface.call_count == 1
+        assert llm_interface.aclient.chat.completions.create.call_args[1]['model'] == 'backup-model'
+        llm_interface.client.chat.completions.create.assert_not_called()
+    
+    def test_abatch(self, llm_interface):
+        """测试并发批量请求"""
+        def make_response(content):
+            return MagicMock(
+                choices=[MagicMock(message=MagicMock(content=content))],
+                usage=MagicMock(prompt_tokens=1, completion_tokens=1)
+            )
+        
+        llm_interface.aclient.chat.completions.create.side_effect = [
+            make_response('响应1'),
+            make_response('响应2')
+        ]
+        
+        results = asyncio.run(llm_interface.abatch([
+            [{"role": "user", "content": "消息1"}],
+            [{"role": "user", "content": "消息2"}]
+        ]))
+        
+        assert results == ['响应1', '响应2']
+        assert llm_interface.call_count == 2
+    
+    def test_submit_and_poll_batch(self, llm_interface):
+        """测试通过Batch API提交并取回离线请求"""
+        client = llm_interface.client
+        client.files.create.return_value = MagicMock(id='file-1')
+        client.batches.create.return_value = MagicMock(id='batch-1')
+        client.batches.retrieve.return_value = MagicMock(
+            status='completed',
+            output_file_id='file-2',
+            request_counts=MagicMock(total=2)
+        )
+        client.files.content.return_value = MagicMock(text="\n".join([
+            json.dumps({"custom_id": "r1", "response": {"status_code": 200, "body": {
+                "choices": [{"message": {"content": "响应2"}}], "usage": {"total_tokens": 7}}}}),
+            json.dumps({"custom_id": "r0", "response": {"status_code": 500, "body": {}}})
+        ]))
+        
+        batch_id = llm_interface.submit_batch([
+            {"messages": [{"role": "user", "content": "消息1"}]},
+            {"messages": [{"role": "user", "content": "消息2"}], "temperature": 0}
+        ])
+        assert batch_id == 'batch-1'
+        
+        # 上传的JSONL每行对应一个请求
+        uploaded = client.files.create.call_args[1]['file'][1].decode('utf-8').splitlines()
+        assert [json.loads(line)["custom_id"] for line in uploaded] == ['r0', 'r1']
+        assert json.loads(uploaded[1])["body"]["temperature"] == 0
+        
+        # 结果按提交顺序返回，失败的请求为None
+        assert llm_interface.poll_batch(batch_id) == [None, '响应2']
+        assert llm_interface.total_tokens == 7
+    
+    def test_token_bucket(self):
+        """测试令牌桶限流"""
+        bucket = TokenBucket(rpm=2, tpm=1000)
+        
+        async def acquire_twice():
+            await bucket.acquire(400)
+            await bucket.acquire(400)
+        
+        asyncio.run(acquire_twice())
+        
+        # 请求数和token配额都已基本耗尽
+        assert bucket._requests < 1
+        assert bucket._tokens < 400
+        
+        # 退还后可以立即再次获取
+        bucket.refund(400)
+        assert bucket._requests >= 1
+        assert bucket._tokens >= 400
+    
+    def test_get_chat_response_prompt_cache(self, llm_interface):
+        """测试支持提示缓存时系统提醒带有cache_control标记"""
+        llm_interface.aclient.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content='CLICK #submit'))],
+            usage=MagicMock(prompt_tokens=1, completion_tokens=1)
+        )
+        messages = [{"role": "system", "content": "系统提示"}] + [
+            {"role": "user", "content": f"消息{i}"} for i in range(3)
+        ]
+        
+        # 默认不发送cache_control
+        asyncio.run(llm_interface.get_chat_response(messages))
+        sent_messages = llm_interface.aclient.chat.completions.create.call_args[1]['messages']
+        assert len(sent_messages) == 5
+        assert isinstance(sent_messages[1]["content"], str)
+        
+        llm_interface.provider_supports_prompt_cache = True
+        assert asyncio.run(llm_interface.get_chat_response(messages)) == 'CLICK #submit'
+        sent_messages = llm_interface.aclient.chat.completions.create.call_args[1]['messages']
+        assert sent_messages[1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+        assert len(messages) == 4
+    
     def test_json_completion(self, llm_interface):
         """测试JSON补全"""
         # 配置模拟响应
@@ -143,6 +357,57 @@ class TestLLMInterface:
         call_args = llm_interface.client.chat.completions.create.call_args
         assert call_args[1]['response_format'] == {"type": "json_object"}
     
+    def test_json_completion_does_not_mutate_messages(self, llm_interface):
+        """测试JSON补全不会修改调用方传入的消息列表"""
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = '{"ok": true}'
+        mock_response.usage.prompt_tokens = 1
+        mock_response.usage.completion_tokens = 1
+        llm_interface.client.chat.completions.create.return_value = mock_response
+        
+        messages = [
+            {"role": "system", "content": "你是一个助手"},
+            {"role": "user", "content": "返回JSON"}
+        ]
+        llm_interface.json_completion(messages)
+        
+        # 调用方的消息保持不变
+        assert messages[0]["content"] == "你是一个助手"
+        assert len(messages) == 2
+        
+        # 实际发送的系统消息包含JSON说明
+        sent_messages = llm_interface.client.chat.completions.create.call_args[1]['messages']
+        assert "JSON" in sent_messages[0]["content"]
+        assert len(sent_messages) == 2
+    
+    def test_json_completion_disk_cache_uses_answering_model(self, llm_interface):
+        """测试回退到备选模型时JSON结果按备选模型写入磁盘缓存"""
+        class FakeDiskCache(dict):
+            def set(self, key, value, expire=None):
+                self[key] = value
+        
+        llm_interface.disk_cache = FakeDiskCache()
+        llm_interface.client.chat.completions.create.side_effect = [
+            Exception("模型不可用"),
+            MagicMock(
+                choices=[MagicMock(message=MagicMock(content='{"source": "backup"}'))],
+                usage=MagicMock(prompt_tokens=1, completion_tokens=1)
+            )
+        ]
+        
+        messages = [{"role": "user", "content": "测试消息"}]
+        assert llm_interface.json_completion(messages) == {"source": "backup"}
+        
+        # 主模型恢复后，不应从缓存中读到备选模型的结果
+        llm_interface.reset_model()
+        llm_interface.client.chat.completions.create.side_effect = None
+        llm_interface.client.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content='{"source": "primary"}'))],
+            usage=MagicMock(prompt_tokens=1, completion_tokens=1)
+        )
+        assert llm_interface.json_completion(messages) == {"source": "primary"}
+    
     def test_reset_model(self, llm_interface):
         """测试重置模型"""
         # 切换到备选模型